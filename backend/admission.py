@@ -0,0 +1,219 @@
+"""Admission control for outbound LLM calls.
+
+Every provider call passes through a token-bucket rate limit and an
+AIMD-style concurrency limit. Callers that cannot be admitted in time are
+shed with an LLMUnavailable error carrying the HTTP status and Retry-After
+value the API should return, instead of piling onto a rate-limited provider.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+
+class LLMUnavailable(Exception):
+    """Raised when an LLM call is rejected before or by the provider."""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class LLMRateLimited(LLMUnavailable):
+    status_code = 429
+
+
+class LLMOverloaded(LLMUnavailable):
+    status_code = 503
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """Best-effort detection of a provider 429 across client libraries."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    text = str(exc).lower()
+    return "429" in text or "rate limit" in text or "resource exhausted" in text
+
+
+class TokenBucket:
+    """Classic token bucket that hands out reservations, possibly in debt."""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Reserve one token and return the delay before using it, or None if it exceeds ``max_wait``."""
+        self._refill()
+        delay = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if delay > max_wait:
+            return None
+        self.tokens -= 1
+        return delay
+
+    def time_until_available(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Token-bucket rate limit plus an adaptive (AIMD) concurrency limit."""
+
+    def __init__(self, rate_per_second: float = 20.0, burst: int = 40, initial_limit: int = 8,
+                 min_limit: int = 1, max_limit: int = 32, max_queue: int = 100,
+                 max_wait_seconds: float = 10.0, latency_target_seconds: float = 8.0):
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.latency_target_seconds = latency_target_seconds
+        self.avg_latency = latency_target_seconds / 2
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_queue = 0
+        self.shed = 0
+        self.provider_rate_limited = 0
+
+    def _budget(self, deadline: Optional[float]) -> float:
+        budget = self.max_wait_seconds
+        if deadline is not None:
+            budget = min(budget, deadline - time.monotonic())
+        return budget
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _queue_error(self, budget: float) -> Optional[LLMOverloaded]:
+        """The error to shed a caller with instead of queueing it, if any."""
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue += 1
+            return LLMOverloaded("LLM request queue is full", retry_after=self.avg_latency)
+
+        # Shed immediately when the expected queueing delay already blows the budget
+        expected_wait = (len(self._waiters) + 1) * self.avg_latency / max(self.limit, 1)
+        if expected_wait > budget:
+            self.shed += 1
+            return LLMOverloaded("LLM capacity exhausted", retry_after=expected_wait)
+        return None
+
+    async def _acquire_slot(self, budget: float):
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+
+        error = self._queue_error(budget)
+        if error is not None:
+            raise error
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=budget)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise LLMOverloaded("Timed out waiting for LLM capacity", retry_after=self.avg_latency)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was already handed to us; give it back.
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _on_success(self, latency: float):
+        self.avg_latency = 0.8 * self.avg_latency + 0.2 * latency
+        if latency <= self.latency_target_seconds:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        self._wake_waiters()
+
+    def _on_overload(self):
+        self.provider_rate_limited += 1
+        self.limit = max(self.min_limit, self.limit / 2)
+
+    def would_shed(self, deadline: Optional[float]) -> Optional[LLMUnavailable]:
+        """The error ``admit`` would shed a call with right now, or None.
+
+        Callers that wait on a call shared with other requests use this to
+        apply their own deadline, since the shared call is not bounded by
+        it. Nothing is reserved; a shed is counted as if ``admit`` made it.
+        """
+        budget = self._budget(deadline)
+        wait = self.bucket.time_until_available()
+        if wait > max(budget, 0.0):
+            self.rejected_rate += 1
+            return LLMRateLimited("LLM rate limit exceeded", retry_after=wait)
+        if self._has_capacity() and not self._waiters:
+            return None
+        return self._queue_error(budget)
+
+    @asynccontextmanager
+    async def admit(self, deadline: Optional[float] = None):
+        """Wait for a rate token and a concurrency slot, then run the body.
+
+        ``deadline`` is a ``time.monotonic()`` timestamp; callers that cannot
+        be admitted before it are shed rather than queued.
+        """
+        budget = self._budget(deadline)
+        delay = self.bucket.reserve(max(budget, 0.0))
+        if delay is None:
+            self.rejected_rate += 1
+            raise LLMRateLimited("LLM rate limit exceeded", retry_after=self.bucket.time_until_available())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        await self._acquire_slot(self._budget(deadline))
+        self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self._on_overload()
+                raise LLMRateLimited("LLM provider is rate limiting requests", retry_after=self.avg_latency) from e
+            raise
+        else:
+            self._on_success(time.monotonic() - started)
+        finally:
+            self._release_slot()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected_rate_limit": self.rejected_rate,
+            "rejected_queue_full": self.rejected_queue,
+            "shed": self.shed,
+            "provider_rate_limited": self.provider_rate_limited,
+            "avg_latency_seconds": round(self.avg_latency, 3),
+        }
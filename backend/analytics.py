@@ -0,0 +1,281 @@
+"""Periodic rollups of the form help and chat history logs.
+
+The job aggregates the last ``window_days`` of history into three small
+collections that are replaced on every run:
+
+- ``analytics_top_fields``: per form context, the most requested fields
+  with how the latest answer was produced and its answer cache key
+- ``analytics_top_questions``: per page URL, chat volume and the most
+  frequent questions
+- ``analytics_llm_latency``: per endpoint, LLM latency percentiles
+
+After each run the worker that computed the rollups refreshes the cached
+answers of the top fields. Every worker runs the loop, but a lease document
+in ``analytics_jobs`` lets only one of them do this per interval.
+"""
+import asyncio
+import logging
+import os
+import socket
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from pymongo.errors import DuplicateKeyError
+
+from answer_cache import normalize_options, normalize_text
+
+logger = logging.getLogger(__name__)
+
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+
+def percentiles(values: Sequence[float], points: Sequence[int] = LATENCY_PERCENTILES) -> Dict[str, float]:
+    """Nearest-rank percentiles of ``values`` keyed ``p50``, ``p90``, ..."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        f"p{point}": round(ordered[min(len(ordered) - 1, max(0, -(-point * len(ordered) // 100) - 1))], 1)
+        for point in points
+    }
+
+
+class AnalyticsRollup:
+    """Computes the history rollups and serves them back to the workers."""
+
+    def __init__(self, db, window_days: int = 7, top_fields: int = 50, top_questions: int = 20,
+                 latency_sample: int = 50000, lease_seconds: int = 600):
+        self.db = db
+        self.window_days = window_days
+        self.top_fields_per_context = top_fields
+        self.top_questions_per_page = top_questions
+        self.latency_sample = latency_sample
+        self.lease_seconds = lease_seconds
+        self._worker: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.skipped = 0
+        self.failed = 0
+        self.last_run: Optional[dict] = None
+
+    @property
+    def owner(self) -> str:
+        # Read at call time: with preload_app the instance is created in the
+        # Gunicorn master, before the workers fork
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    async def ensure_indexes(self):
+        await self.db.analytics_top_fields.create_index([("total", -1)])
+        await self.db.analytics_top_questions.create_index([("chats", -1)])
+
+    async def run(self) -> dict:
+        """Recompute every rollup from the history window and replace the old ones."""
+        started = datetime.now(timezone.utc)
+        since = started - timedelta(days=self.window_days)
+        fields = await self._top_fields(since, started)
+        questions = await self._top_questions(since, started)
+        latency = await self._llm_latency(since, started)
+        for collection, docs in (
+            (self.db.analytics_top_fields, fields),
+            (self.db.analytics_top_questions, questions),
+            (self.db.analytics_llm_latency, latency),
+        ):
+            for doc in docs:
+                await collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+            await collection.delete_many({"computed_at": {"$lt": started}})
+
+        self.runs += 1
+        self.last_run = {
+            "computed_at": started.isoformat(),
+            "seconds": round((datetime.now(timezone.utc) - started).total_seconds(), 3),
+            "form_contexts": len(fields),
+            "pages": len(questions),
+            "latency_endpoints": len(latency),
+        }
+        logger.info(f"Analytics rollup: {self.last_run}")
+        return self.last_run
+
+    async def _top_fields(self, since: datetime, computed_at: datetime) -> List[dict]:
+        # Entries logged before form_context was recorded cannot be replayed
+        pipeline = [
+            {"$match": {"timestamp": {"$gte": since}, "form_context": {"$exists": True}}},
+            {"$sort": {"timestamp": -1}},
+            {"$group": {
+                "_id": {
+                    "form_context": "$form_context",
+                    "field_label": "$field_label",
+                    "field_type": "$field_type",
+                    "field_options": "$field_options",
+                },
+                "count": {"$sum": 1},
+                "source": {"$first": "$source"},
+                "cache_key": {"$first": "$cache_key"},
+                "last_seen": {"$first": "$timestamp"},
+            }},
+        ]
+        # Differently decorated labels ("Name *", "name:") are one field
+        merged: Dict[tuple, dict] = {}
+        async for group in self.db.form_help_history.aggregate(pipeline):
+            request = group["_id"]
+            key = (
+                request.get("form_context") or "",
+                normalize_text(request.get("field_label")),
+                normalize_text(request.get("field_type")),
+                normalize_options(request.get("field_options")),
+            )
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = entry = {**request, "count": 0, "last_seen": group["last_seen"]}
+            entry["count"] += group["count"]
+            if group["last_seen"] >= entry["last_seen"]:
+                entry.update(field_label=request.get("field_label"), last_seen=group["last_seen"],
+                             source=group.get("source"), cache_key=group.get("cache_key"))
+
+        by_context = defaultdict(list)
+        for (form_context, *_), entry in merged.items():
+            by_context[form_context].append(entry)
+        docs = []
+        for form_context, entries in by_context.items():
+            entries.sort(key=lambda entry: entry["count"], reverse=True)
+            docs.append({
+                "_id": form_context,
+                "total": sum(entry["count"] for entry in entries),
+                "fields": [
+                    {k: v for k, v in entry.items() if k not in ("form_context", "last_seen")}
+                    for entry in entries[:self.top_fields_per_context]
+                ],
+                "window_days": self.window_days,
+                "computed_at": computed_at,
+            })
+        return docs
+
+    async def _top_questions(self, since: datetime, computed_at: datetime) -> List[dict]:
+        pipeline = [
+            {"$match": {"timestamp": {"$gte": since}}},
+            {"$group": {
+                "_id": {"page_url": "$page_url", "user_message": "$user_message"},
+                "count": {"$sum": 1},
+            }},
+        ]
+        chats, questions = Counter(), defaultdict(Counter)
+        async for group in self.db.chat_history.aggregate(pipeline):
+            page_url = group["_id"].get("page_url") or ""
+            chats[page_url] += group["count"]
+            question = normalize_text(group["_id"].get("user_message"))
+            if question:
+                questions[page_url][question] += group["count"]
+        return [
+            {
+                "_id": page_url,
+                "chats": count,
+                "questions": [
+                    {"question": question, "count": n}
+                    for question, n in questions[page_url].most_common(self.top_questions_per_page)
+                ],
+                "window_days": self.window_days,
+                "computed_at": computed_at,
+            }
+            for page_url, count in chats.items()
+        ]
+
+    async def _llm_latency(self, since: datetime, computed_at: datetime) -> List[dict]:
+        docs = []
+        for endpoint, collection in (("form-help", self.db.form_help_history), ("chat", self.db.chat_history)):
+            cursor = collection.find(
+                {"timestamp": {"$gte": since}, "llm_ms": {"$type": "number"}},
+                {"_id": 0, "llm_ms": 1}
+            ).sort("timestamp", -1).limit(self.latency_sample)
+            values = [doc["llm_ms"] async for doc in cursor]
+            if not values:
+                continue
+            docs.append({
+                "_id": endpoint,
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values), 1),
+                "max_ms": round(max(values), 1),
+                **{f"{name}_ms": value for name, value in percentiles(values).items()},
+                "window_days": self.window_days,
+                "computed_at": computed_at,
+            })
+        return docs
+
+    async def top_fields(self, limit: int) -> List[dict]:
+        """The ``limit`` most requested fields across all form contexts, most requested first."""
+        fields = []
+        async for doc in self.db.analytics_top_fields.find({}, {"fields": 1}):
+            fields.extend({**field, "form_context": doc["_id"]} for field in doc.get("fields", []))
+        fields.sort(key=lambda field: field["count"], reverse=True)
+        return fields[:limit]
+
+    async def summary(self) -> dict:
+        """All current rollups, for the analytics endpoint."""
+        return {
+            "top_fields": await self.db.analytics_top_fields.find().sort("total", -1).to_list(None),
+            "top_questions": await self.db.analytics_top_questions.find().sort("chats", -1).to_list(None),
+            "llm_latency": await self.db.analytics_llm_latency.find().to_list(None),
+        }
+
+    async def _acquire_lease(self, interval: int) -> bool:
+        """Claim this interval's run; False if another worker ran or is running it."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.analytics_jobs.update_one(
+                {"_id": "rollup", "next_run_at": {"$lte": now}},
+                {"$set": {
+                    "owner": self.owner,
+                    "started_at": now,
+                    "next_run_at": now + timedelta(seconds=min(interval, self.lease_seconds)),
+                }},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def _release_lease(self, interval: int):
+        await self.db.analytics_jobs.update_one(
+            {"_id": "rollup", "owner": self.owner},
+            {"$set": {"next_run_at": datetime.now(timezone.utc) + timedelta(seconds=interval)}},
+        )
+
+    def start(self, interval: int, on_rollup: Callable[[], Awaitable[None]]):
+        """Run the rollup when due and every ``interval`` seconds after.
+
+        ``on_rollup`` runs after each rollup this worker computed, while it
+        still holds the lease.
+        """
+        if self._worker is None and interval > 0:
+            self._worker = asyncio.create_task(self._run(interval, on_rollup))
+
+    async def _run(self, interval: int, on_rollup: Callable[[], Awaitable[None]]):
+        while True:
+            try:
+                if await self._acquire_lease(interval):
+                    await self.run()
+                    await on_rollup()
+                    await self._release_lease(interval)
+                else:
+                    self.skipped += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Analytics rollup failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "last_run": self.last_run,
+            "window_days": self.window_days,
+        }
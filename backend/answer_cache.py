@@ -0,0 +1,165 @@
+"""Answer cache for /api/form-help.
+
+Answers are keyed on the normalized (field_label, field_type, field_options,
+form_context) tuple. Hits are served from an in-process LRU with a TTL, and
+every entry is mirrored into a MongoDB collection so all workers share it.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from label_matcher import canonicalize
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION_RE = re.compile(r"^[\s:*.\-]+|[\s:*.\-]+$")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Lowercase, collapse whitespace and strip label decoration like ':' and '*'."""
+    if not value:
+        return ""
+    value = _WHITESPACE_RE.sub(" ", value).strip().lower()
+    return _EDGE_PUNCTUATION_RE.sub("", value)
+
+
+def normalize_options(options: Optional[str]) -> str:
+    """Normalize a comma-separated option list so option order does not matter."""
+    if not options:
+        return ""
+    parts = {normalize_text(part) for part in options.split(",")}
+    return ",".join(sorted(part for part in parts if part))
+
+
+def make_cache_key(field_label: str, field_type: Optional[str], field_options: Optional[str],
+                   form_context: Optional[str]) -> str:
+    """Build a stable cache key from the normalized form-help request tuple.
+
+    ``field_label`` may be a canonical field id when the label matched a
+    known field, so differently scraped labels share one entry.
+    """
+    raw = "\x1f".join([
+        canonicalize(field_label),
+        normalize_text(field_type),
+        normalize_options(field_options),
+        normalize_text(form_context),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Two-level (memory LRU + MongoDB) cache of FormHelpResponse payloads."""
+
+    def __init__(self, collection, max_entries: int = 2048, ttl_seconds: int = 86400):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    async def ensure_indexes(self):
+        """Create the TTL index that lets MongoDB expire shared entries."""
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Return the cached response payload for ``key``, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._entries[key]
+
+        value = await self._load(key)
+        if value is not None:
+            self.mongo_hits += 1
+            return value
+
+        self.misses += 1
+        return None
+
+    async def _load(self, key: str) -> Optional[dict]:
+        """Copy an unexpired shared entry into memory and return it."""
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"_id": 0, "response": 1, "expires_at": 1})
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
+            return None
+
+        if doc:
+            expires_at = doc.get("expires_at")
+            if expires_at is not None and expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            now = datetime.now(timezone.utc)
+            if expires_at is None or expires_at > now:
+                # Keep the shared expiry rather than restarting the TTL
+                ttl = self.ttl_seconds if expires_at is None else (expires_at - now).total_seconds()
+                self._remember(key, doc["response"], min(ttl, self.ttl_seconds))
+                return doc["response"]
+        return None
+
+    async def expires_in(self, key: str) -> Optional[float]:
+        """Seconds until the shared entry for ``key`` expires, or None if there is none.
+
+        Used by the cache refresh, so it leaves the hit counters and the
+        in-memory LRU alone.
+        """
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"_id": 0, "expires_at": 1})
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
+            return None
+        if not doc:
+            return None
+        expires_at = doc.get("expires_at")
+        if expires_at is None:
+            return float(self.ttl_seconds)
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        return remaining if remaining > 0 else None
+
+    async def set(self, key: str, value: dict):
+        """Store ``value`` in memory and in the shared collection."""
+        self._remember(key, value)
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "response": value,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Answer cache write failed: {e}")
+
+    def _remember(self, key: str, value: dict, ttl: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (self.ttl_seconds if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.mongo_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
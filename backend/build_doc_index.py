@@ -0,0 +1,77 @@
+"""Build the form instruction retrieval index used by /api/chat.
+
+Usage (from the backend directory):
+    python build_doc_index.py [--docs data/form_docs] [--output data/doc_index]
+
+Every ``*.md`` file under ``--docs`` is split into passages by section. The
+passages' L2-normalized TF-IDF vectors are written to ``vectors.npy`` and the
+vocabulary, IDF weights and passage text to ``meta.json``. Rebuild whenever
+a document changes.
+"""
+import argparse
+import hashlib
+import json
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from doc_index import split_passages, sublinear_tf, term_counts
+
+ROOT_DIR = Path(__file__).parent
+INDEX_VERSION = 1
+
+
+def build_index(docs_dir: Path):
+    digest = hashlib.sha256()
+    passages = []
+    for path in sorted(docs_dir.glob("*.md")):
+        raw = path.read_bytes()
+        digest.update(path.name.encode("utf-8") + b"\x1f" + raw)
+        passages.extend(split_passages(raw.decode("utf-8"), path.name))
+    if not passages:
+        raise ValueError(f"No passages found in {docs_dir}")
+
+    counts = [term_counts(passage) for passage in passages]
+    doc_freq = Counter(term for passage_counts in counts for term in passage_counts)
+    vocabulary = sorted(doc_freq)
+    columns = {term: i for i, term in enumerate(vocabulary)}
+    n = len(passages)
+    idf = [math.log((1 + n) / (1 + doc_freq[term])) + 1 for term in vocabulary]
+
+    vectors = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    for row, passage_counts in enumerate(counts):
+        for term, count in passage_counts.items():
+            vectors[row, columns[term]] = sublinear_tf(count) * idf[columns[term]]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "docs_sha256": digest.hexdigest(),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "vocabulary": vocabulary,
+        "idf": [round(value, 6) for value in idf],
+        "passages": passages,
+    }
+    return vectors, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=Path, default=ROOT_DIR / "data" / "form_docs")
+    parser.add_argument("--output", type=Path, default=ROOT_DIR / "data" / "doc_index")
+    args = parser.parse_args()
+
+    vectors, meta = build_index(args.docs)
+    args.output.mkdir(parents=True, exist_ok=True)
+    np.save(args.output / "vectors.npy", vectors)
+    (args.output / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"Wrote document index v{meta['version']} with {len(meta['passages'])} passages and "
+          f"{len(meta['vocabulary'])} terms to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
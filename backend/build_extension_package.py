@@ -0,0 +1,66 @@
+"""Build the downloadable Chrome extension served by /api/extension/download.
+
+Usage (from the backend directory):
+    python build_extension_package.py [--source ../extension]
+                                      [--output ../formwise-extension.zip]
+
+Files are added in sorted order with fixed timestamps, so the same sources
+always produce the same archive and the same SHA-256. The version comes
+from the extension's ``manifest.json``; bump it there for every release.
+The artifact manifest (version, size, SHA-256) is written next to the
+archive as ``formwise-extension.manifest.json``.
+"""
+import argparse
+import hashlib
+import json
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from extension_package import manifest_path_for, version_tag
+
+ROOT_DIR = Path(__file__).parent
+APP_DIR = ROOT_DIR.parent
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def build_package(source_dir: Path, output: Path) -> dict:
+    version = json.loads((source_dir / "manifest.json").read_text(encoding="utf-8"))["version"]
+    files = sorted(
+        path for path in source_dir.rglob("*")
+        if path.is_file() and not path.name.startswith(".") and path.name != "README.md"
+    )
+    with zipfile.ZipFile(output, "w") as archive:
+        for path in files:
+            info = zipfile.ZipInfo(path.relative_to(source_dir).as_posix(), FIXED_DATE_TIME)
+            info.external_attr = 0o644 << 16
+            # PNGs are already compressed
+            info.compress_type = zipfile.ZIP_STORED if path.suffix == ".png" else zipfile.ZIP_DEFLATED
+            archive.writestr(info, path.read_bytes(), compresslevel=9)
+
+    content = output.read_bytes()
+    sha256 = hashlib.sha256(content).hexdigest()
+    return {
+        "version": version,
+        "sha256": sha256,
+        "size": len(content),
+        "tag": version_tag(version, sha256),
+        "files": len(files),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", type=Path, default=APP_DIR / "extension")
+    parser.add_argument("--output", type=Path, default=APP_DIR / "formwise-extension.zip")
+    args = parser.parse_args()
+
+    manifest = build_package(args.source, args.output)
+    manifest_path_for(args.output).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"Wrote extension package v{manifest['version']} ({manifest['size']} bytes, "
+          f"{manifest['files']} files, sha256 {manifest['sha256'][:12]}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Build the precomputed field guidance index served by /api/form-help.
+
+Usage (from the backend directory):
+    python build_field_guidance.py [--catalogue data/field_catalogue.json]
+                                   [--output data/field_guidance.json.gz]
+                                   [--curated-only]
+
+Catalogue fields with a curated ``response`` are used as-is; the rest are
+generated once with the same prompt the live endpoint uses. Bump the
+catalogue ``version`` whenever its content changes.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+from field_guidance import label_key
+from server import (
+    FORM_HELP_SYSTEM_MESSAGE,
+    FormHelpRequest,
+    FormHelpResponse,
+    build_form_help_prompt,
+    llm_client,
+    parse_form_help_response,
+)
+
+ROOT_DIR = Path(__file__).parent
+
+
+async def generate_response(field: dict, form_context: str) -> dict:
+    request = FormHelpRequest(
+        field_label=field["labels"][0],
+        field_type=field.get("field_type", "input"),
+        field_options=", ".join(field.get("options", [])),
+        form_context=form_context
+    )
+    reply = await llm_client.send(FORM_HELP_SYSTEM_MESSAGE, build_form_help_prompt(request))
+    result, complete = parse_form_help_response(reply, request.field_label)
+    if result is None or not complete:
+        raise ValueError(f"Model returned invalid or incomplete JSON for field '{field['id']}'")
+    return result.model_dump()
+
+
+async def build_index(catalogue_path: Path, curated_only: bool) -> dict:
+    raw = catalogue_path.read_bytes()
+    catalogue = json.loads(raw)
+
+    contexts, labels, responses = [], {}, {}
+    for context in catalogue["contexts"]:
+        context_id = context["id"]
+        contexts.append({"id": context_id, "aliases": [label_key(a) for a in context["aliases"]]})
+        labels[context_id] = {}
+
+        for field in context["fields"]:
+            if "response" in field:
+                payload = {**field["response"], "field_label": field["labels"][0]}
+            elif curated_only:
+                print(f"  skipping {context_id}/{field['id']} (no curated response)")
+                continue
+            else:
+                print(f"  generating {context_id}/{field['id']}")
+                payload = await generate_response(field, context["aliases"][0])
+
+            # Validate and fill defaults exactly as the endpoint would
+            response = FormHelpResponse(**payload).model_dump()
+            response.pop("field_label")
+            responses[f"{context_id}/{field['id']}"] = response
+
+            for label in field["labels"]:
+                key = label_key(label)
+                if key in labels[context_id] and labels[context_id][key] != field["id"]:
+                    raise ValueError(f"Label '{label}' maps to both {labels[context_id][key]} and {field['id']}")
+                labels[context_id][key] = field["id"]
+
+    return {
+        "version": catalogue["version"],
+        "catalogue_sha256": hashlib.sha256(raw).hexdigest(),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "contexts": contexts,
+        "labels": labels,
+        "responses": responses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalogue", type=Path, default=ROOT_DIR / "data" / "field_catalogue.json")
+    parser.add_argument("--output", type=Path, default=ROOT_DIR / "data" / "field_guidance.json.gz")
+    parser.add_argument("--curated-only", action="store_true", help="skip fields that would need an LLM call")
+    args = parser.parse_args()
+
+    index = asyncio.run(build_index(args.catalogue, args.curated_only))
+    data = json.dumps(index, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    with open(args.output, "wb") as f:
+        with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+            gz.write(data)
+    print(f"Wrote field guidance index v{index['version']} with {len(index['responses'])} fields "
+          f"to {args.output} ({args.output.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Token-budgeted context builder for /api/chat prompts.
+
+Instead of sending the first 8000 characters of the page, every form value
+and the last ten messages verbatim, the page text is split into chunks that
+are ranked against the user's question with BM25, and the best chunks, the
+most relevant form fields and a summarized history are packed into a fixed
+token budget.
+"""
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9ऀ-ॿ]+")
+_SENTENCE_RE = re.compile(r"(?<=[.?!:;।])\s+|\n+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its my "
+    "of on or should the this to was what when where which who why will with you your".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for budgeting."""
+    return (len(text) + 3) // 4
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_chars: int = 600) -> List[str]:
+    """Split page text into roughly ``chunk_chars``-sized chunks on sentence boundaries."""
+    chunks, current = [], ""
+    for sentence in _SENTENCE_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        while len(sentence) > chunk_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:chunk_chars])
+            sentence = sentence[chunk_chars:]
+        if current and len(current) + len(sentence) + 1 > chunk_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25:
+    """Okapi BM25 over a small in-memory corpus of pre-tokenized chunks."""
+
+    def __init__(self, documents: Sequence[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.doc_lens = [len(doc) for doc in documents]
+        self.avg_len = (sum(self.doc_lens) / len(documents)) if documents else 0.0
+        doc_freq = Counter(term for doc in documents for term in set(doc))
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def scores(self, query: List[str]) -> List[float]:
+        results = []
+        for tf, length in zip(self.term_freqs, self.doc_lens):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_len) if self.avg_len else self.k1
+            for term in query:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf.get(term, 0.0) * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+
+@dataclass
+class ChunkedPage:
+    """Page text split into chunks with its BM25 index, reusable across questions."""
+    chunks: List[str]
+    index: BM25 = field(repr=False)
+
+    @classmethod
+    def from_text(cls, text: str, chunk_chars: int = 600) -> "ChunkedPage":
+        chunks = chunk_text(text or "", chunk_chars)
+        return cls(chunks=chunks, index=BM25([tokenize(c) for c in chunks]))
+
+
+def select_chunks(page: ChunkedPage, question: str, budget_tokens: int) -> List[Tuple[int, str]]:
+    """Pick the highest-scoring chunks that fit the budget, returned in page order."""
+    if not page.chunks or budget_tokens <= 0:
+        return []
+    scores = page.index.scores(tokenize(question))
+    # Ties (including a question with no overlap) fall back to page order
+    ranked = sorted(range(len(page.chunks)), key=lambda i: (-scores[i], i))
+    picked, used = [], 0
+    for i in ranked:
+        cost = estimate_tokens(page.chunks[i])
+        if used + cost > budget_tokens:
+            continue
+        picked.append(i)
+        used += cost
+    return [(i, page.chunks[i]) for i in sorted(picked)]
+
+
+def select_form_fields(form_data: Dict[str, object], question: str, budget_tokens: int) -> List[str]:
+    """Pick non-empty form values, most relevant to the question first, within budget."""
+    query = set(tokenize(question))
+    lines = []
+    for name, value in (form_data or {}).items():
+        if not value:
+            continue
+        line = f"- {name}: {value}"
+        overlap = len(query & set(tokenize(f"{name} {value}")))
+        lines.append((-overlap, len(lines), line))
+    picked, used = [], 0
+    for _, _, line in sorted(lines):
+        cost = estimate_tokens(line)
+        if used + cost > budget_tokens:
+            continue
+        picked.append(line)
+        used += cost
+    return picked
+
+
+def summarize_turn(content: str, max_chars: int = 160) -> str:
+    """Extractive one-line summary: the first sentence, truncated."""
+    first = _SENTENCE_RE.split(content.strip(), maxsplit=1)[0]
+    return first if len(first) <= max_chars else first[:max_chars - 3].rstrip() + "..."
+
+
+def select_history(history: Sequence[Tuple[str, str]], budget_tokens: int, verbatim_turns: int = 4) -> List[str]:
+    """Keep the newest turns verbatim and compress older ones into one-line summaries.
+
+    ``history`` is a sequence of ``(role_label, content)`` pairs, oldest first.
+    """
+    lines, used = [], 0
+    for position, (role, content) in enumerate(reversed(history)):
+        text = content if position < verbatim_turns else summarize_turn(content)
+        line = f"{role}: {text}"
+        cost = estimate_tokens(line)
+        if used + cost > budget_tokens:
+            if position < verbatim_turns:
+                # Fall back to a summary of a long recent turn rather than dropping it
+                line = f"{role}: {summarize_turn(content)}"
+                cost = estimate_tokens(line)
+            if used + cost > budget_tokens:
+                break
+        lines.append(line)
+        used += cost
+    return list(reversed(lines))
+
+
+@dataclass
+class ContextBudget:
+    total_tokens: int = 2500
+    history_share: float = 0.2
+    form_share: float = 0.2
+
+    @property
+    def history_tokens(self) -> int:
+        return int(self.total_tokens * self.history_share)
+
+    @property
+    def form_tokens(self) -> int:
+        return int(self.total_tokens * self.form_share)
+
+
+def build_context_sections(question: str, page: ChunkedPage, form_data: Dict[str, object],
+                           history: Sequence[Tuple[str, str]], budget: ContextBudget,
+                           memory: Sequence[str] = ()) -> Dict[str, str]:
+    """Build the history, page and form sections of a chat prompt within ``budget``.
+
+    ``memory`` holds one-line summaries of turns older than ``history`` and
+    is spent from the history budget first. Unused history and form budget
+    is handed to the page text.
+    """
+    memory_lines, memory_used = [], 0
+    for line in memory:
+        cost = estimate_tokens(line)
+        if memory_used + cost > budget.history_tokens // 2:
+            break
+        memory_lines.append(line)
+        memory_used += cost
+    history_lines = memory_lines + select_history(history, budget.history_tokens - memory_used)
+    form_lines = select_form_fields(form_data, question, budget.form_tokens)
+    used = sum(estimate_tokens(line) for line in history_lines + form_lines)
+    page_chunks = select_chunks(page, question, budget.total_tokens - used)
+
+    page_parts, previous = [], -1
+    for index, chunk in page_chunks:
+        if previous >= 0 and index != previous + 1:
+            page_parts.append("[...]")
+        page_parts.append(chunk)
+        previous = index
+    if page_chunks and previous != len(page.chunks) - 1:
+        page_parts.append("[...]")
+
+    return {
+        "history": "\n".join(history_lines),
+        "page": "\n".join(page_parts),
+        "form": "\n".join(form_lines),
+    }
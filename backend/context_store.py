@@ -0,0 +1,161 @@
+"""Server-held page contexts for chat requests.
+
+Page text is identified by its SHA-256 hash. Once a page has been uploaded,
+follow-up chat messages from the same page send only the hash, and the
+server reuses the pre-chunked ``ChunkedPage`` from a bounded LRU.
+
+Form values are synced the same way: the extension uploads a full snapshot
+once per page, then only the fields that changed, which ``FormStateStore``
+merges into its versioned copy.
+"""
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from context_builder import ChunkedPage
+
+_LONE_SURROGATE_RE = re.compile("[\ud800-\udfff]")
+
+
+class PageContextMissing(Exception):
+    """Raised when a request references a page hash the store does not hold."""
+
+    def __init__(self, page_text_hash: str):
+        super().__init__(f"Page context {page_text_hash} is not cached; resend page_text")
+        self.page_text_hash = page_text_hash
+
+
+class FormStateMissing(Exception):
+    """Raised when a form delta does not apply to the state the store holds."""
+
+    def __init__(self, form_sync_id: str):
+        super().__init__(f"Form state {form_sync_id} is missing or out of date; resend form_data")
+        self.form_sync_id = form_sync_id
+
+
+def hash_page_text(text: str) -> str:
+    """SHA-256 of the UTF-8 text, matching ``crypto.subtle.digest`` over ``TextEncoder`` output."""
+    # TextEncoder replaces unpaired surrogates (e.g. from a truncated emoji) with U+FFFD
+    text = _LONE_SURROGATE_RE.sub("\ufffd", text)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PageContextStore:
+    """Bounded LRU of page hash -> ChunkedPage, limited by entry count and total text size."""
+
+    def __init__(self, max_entries: int = 1000, max_chars: int = 20_000_000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.uploads = 0
+
+    def put(self, text: str) -> tuple:
+        """Chunk and store ``text``; returns ``(hash, ChunkedPage)``."""
+        page_hash = hash_page_text(text)
+        entry = self._entries.get(page_hash)
+        if entry is not None:
+            self._entries.move_to_end(page_hash)
+            return page_hash, entry[0]
+        page = ChunkedPage.from_text(text)
+        self._entries[page_hash] = (page, len(text))
+        self._chars += len(text)
+        self.uploads += 1
+        while self._entries and (len(self._entries) > self.max_entries or self._chars > self.max_chars):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._chars -= size
+        return page_hash, page
+
+    def get(self, page_hash: str) -> Optional[ChunkedPage]:
+        entry = self._entries.get(page_hash)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(page_hash)
+        self.hits += 1
+        return entry[0]
+
+    def resolve(self, page_text: Optional[str], page_text_hash: Optional[str]) -> ChunkedPage:
+        """Return the chunked page for a request, uploading text when it is provided.
+
+        Raises ``PageContextMissing`` when only an unknown hash is given.
+        """
+        if page_text:
+            return self.put(page_text)[1]
+        if page_text_hash:
+            page = self.get(page_text_hash)
+            if page is None:
+                raise PageContextMissing(page_text_hash)
+            return page
+        return ChunkedPage.from_text("")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "chars": self._chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "uploads": self.uploads,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class FormStateStore:
+    """Bounded LRU with a TTL of form sync id -> (version, field values)."""
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.snapshots = 0
+        self.deltas = 0
+        self.misses = 0
+
+    def _put(self, form_sync_id: str, version: Optional[int], values: Dict[str, str]):
+        self._entries[form_sync_id] = (time.monotonic() + self.ttl_seconds, version, values)
+        self._entries.move_to_end(form_sync_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def resolve(self, form_sync_id: Optional[str], form_data: Optional[dict], delta: Optional[dict],
+                base_version: Optional[int], version: Optional[int]) -> dict:
+        """Return the current form values for a request.
+
+        A request without a delta is a full snapshot and replaces the stored
+        state. A delta applies only on top of ``base_version``; a ``None``
+        value removes the field. Raises ``FormStateMissing`` otherwise.
+        """
+        if not form_sync_id:
+            return form_data or {}
+        if delta is None:
+            values = dict(form_data or {})
+            self._put(form_sync_id, version, values)
+            self.snapshots += 1
+            return values
+
+        entry = self._entries.get(form_sync_id)
+        if entry is None or entry[0] <= time.monotonic() or entry[1] != base_version:
+            self.misses += 1
+            raise FormStateMissing(form_sync_id)
+        values = dict(entry[2])
+        for name, value in delta.items():
+            if value is None:
+                values.pop(name, None)
+            else:
+                values[name] = value
+        self._put(form_sync_id, version, values)
+        self.deltas += 1
+        return values
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "snapshots": self.snapshots,
+            "deltas": self.deltas,
+            "misses": self.misses,
+        }
@@ -0,0 +1,107 @@
+"""Request deadlines and cancellation of abandoned requests.
+
+Each endpoint has a timeout budget. Clients may shorten it with the
+``X-Request-Timeout-Ms`` header or a ``timeout_ms`` body field. The
+resulting deadline is kept in a context variable. Before waiting on an LLM
+call, a request is shed if admission control could not start the call
+before its deadline. Calls shared by coalesced requests then run
+unbounded, and each request stops waiting at its own deadline.
+``run_request`` races the handler against the deadline and the client
+disconnecting, and cancels the in-flight LLM call and history write when
+either one wins first.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+from starlette.requests import Request
+
+DEADLINE_HEADER = "x-request-timeout-ms"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("formwise_request_deadline", default=None)
+
+counters = {"timed_out": 0, "disconnected": 0}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before its answer is ready."""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its answer is ready."""
+
+
+def resolve_deadline(request: Request, budget_seconds: float, timeout_ms: Optional[int] = None) -> float:
+    """Monotonic deadline: the endpoint budget, shortened by the client's timeout if given."""
+    timeout = budget_seconds
+    header = request.headers.get(DEADLINE_HEADER)
+    if header:
+        try:
+            timeout = min(timeout, int(header) / 1000)
+        except ValueError:
+            pass
+    if timeout_ms is not None:
+        timeout = min(timeout, timeout_ms / 1000)
+    return time.monotonic() + max(timeout, 0)
+
+
+def set_deadline(deadline: Optional[float]):
+    _deadline.set(deadline)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until ``deadline`` (never negative), or None for no deadline."""
+    return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+
+async def wait_for_disconnect(request: Request):
+    """Return once the client disconnects; the request body must already be read."""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_request(request: Request, work: Awaitable[Any], deadline: float) -> Any:
+    """Await ``work`` under ``deadline``, cancelling it if the client disconnects first."""
+    set_deadline(deadline)
+    task = asyncio.ensure_future(work)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, disconnect}, timeout=remaining(deadline),
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            return task.result()
+        if disconnect in done:
+            counters["disconnected"] += 1
+            raise ClientDisconnected()
+        counters["timed_out"] += 1
+        raise DeadlineExceeded()
+    finally:
+        task.cancel()
+        disconnect.cancel()
+        # Let the cancelled LLM call and history write unwind before responding
+        await asyncio.wait({task, disconnect})
+
+
+async def within_deadline(work: Awaitable[Any], deadline: Optional[float]) -> Any:
+    """Await ``work``, cancelling it and raising ``DeadlineExceeded`` once ``deadline`` passes."""
+    try:
+        return await asyncio.wait_for(work, remaining(deadline))
+    except asyncio.TimeoutError:
+        counters["timed_out"] += 1
+        raise DeadlineExceeded()
+
+
+def record_disconnect():
+    """Count a streaming request cancelled because its client went away."""
+    counters["disconnected"] += 1
+
+
+def stats() -> dict:
+    return dict(counters)
@@ -0,0 +1,141 @@
+"""Retrieval over precomputed vectors of government form instruction documents.
+
+``build_doc_index.py`` splits the documents in ``data/form_docs`` into
+passages and stores their L2-normalized TF-IDF vectors as a NumPy matrix.
+The server memory-maps the matrix and ranks passages for a chat question
+with one vectorized dot product over the question's terms.
+"""
+import json
+import logging
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from context_builder import chunk_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.*)$")
+
+
+def split_sections(markdown: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Split a markdown document into ``(title, [(heading, text), ...])``."""
+    title, heading, sections, lines = "", "", [], []
+    for line in markdown.splitlines():
+        match = _HEADING_RE.match(line)
+        if not match:
+            lines.append(line)
+            continue
+        if lines and "".join(lines).strip():
+            sections.append((heading, "\n".join(lines).strip()))
+        lines = []
+        if len(match.group(1)) == 1 and not title:
+            title = match.group(2).strip()
+        heading = match.group(2).strip()
+    if lines and "".join(lines).strip():
+        sections.append((heading, "\n".join(lines).strip()))
+    return title, sections
+
+
+def split_passages(markdown: str, source: str, chunk_chars: int = 600) -> List[dict]:
+    """Cut a document into passages that keep their section heading."""
+    title, sections = split_sections(markdown)
+    return [
+        {"source": source, "title": title, "heading": heading, "text": chunk}
+        for heading, text in sections
+        for chunk in chunk_text(text, chunk_chars)
+    ]
+
+
+def term_counts(passage: dict) -> Counter:
+    # Headings are repeated so a passage ranks well for the topic it sits under
+    return Counter(tokenize(f"{passage['heading']} {passage['heading']} {passage['text']}"))
+
+
+def sublinear_tf(count: int) -> float:
+    return 1.0 + math.log(count)
+
+
+class DocIndex:
+    """Memory-mapped passage vectors plus the vocabulary and IDF weights to query them."""
+
+    def __init__(self, vectors: Optional[np.ndarray] = None, vocabulary: Optional[Sequence[str]] = None,
+                 idf: Optional[Sequence[float]] = None, passages: Optional[List[dict]] = None,
+                 version: int = 0, docs_sha256: str = "", built_at: str = ""):
+        self.vectors = vectors if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        self.columns: Dict[str, int] = {term: i for i, term in enumerate(vocabulary or [])}
+        self.idf = np.asarray(idf or [], dtype=np.float32)
+        self.passages = passages or []
+        self.version = version
+        self.docs_sha256 = docs_sha256
+        self.built_at = built_at
+        self.queries = 0
+        self.hits = 0
+
+    @classmethod
+    def load(cls, directory: Path) -> "DocIndex":
+        """Load ``meta.json`` and memory-map ``vectors.npy``; a missing index yields an empty one."""
+        try:
+            meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+        except FileNotFoundError:
+            logger.info(f"No document index at {directory}; retrieval disabled")
+            return cls()
+        except Exception as e:
+            logger.warning(f"Could not load document index {directory}: {e}")
+            return cls()
+        if vectors.shape != (len(meta["passages"]), len(meta["vocabulary"])):
+            logger.warning(f"Document index {directory} is inconsistent; retrieval disabled")
+            return cls()
+        index = cls(
+            vectors=vectors,
+            vocabulary=meta["vocabulary"],
+            idf=meta["idf"],
+            passages=meta["passages"],
+            version=meta["version"],
+            docs_sha256=meta.get("docs_sha256", ""),
+            built_at=meta.get("built_at", ""),
+        )
+        logger.info(f"Loaded document index v{index.version} with {len(index.passages)} passages")
+        return index
+
+    def search(self, query: str, top_k: int = 3, min_score: float = 0.1) -> List[dict]:
+        """Return up to ``top_k`` passages scoring at least ``min_score``, best first."""
+        if not self.passages or top_k <= 0:
+            return []
+        self.queries += 1
+        counts = Counter(term for term in tokenize(query) if term in self.columns)
+        if not counts:
+            return []
+        columns = np.fromiter((self.columns[term] for term in counts), dtype=np.intp, count=len(counts))
+        weights = np.fromiter((sublinear_tf(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+        weights *= self.idf[columns]
+        weights /= np.linalg.norm(weights)
+
+        # Only the query's columns matter for the cosine similarity
+        scores = np.asarray(self.vectors[:, columns] @ weights)
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        results = []
+        for i in best[np.argsort(-scores[best])]:
+            if scores[i] < min_score:
+                break
+            results.append({**self.passages[i], "score": round(float(scores[i]), 4)})
+        if results:
+            self.hits += 1
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "docs_sha256": self.docs_sha256,
+            "built_at": self.built_at,
+            "passages": len(self.passages),
+            "vocabulary": len(self.columns),
+            "queries": self.queries,
+            "hits": self.hits,
+        }
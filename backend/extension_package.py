@@ -0,0 +1,147 @@
+"""The downloadable Chrome extension archive and its artifact manifest.
+
+``build_extension_package.py`` zips the ``extension`` directory
+reproducibly and writes a manifest next to the archive with its version,
+size and SHA-256. The server holds the (small) archive in memory and
+serves it with a strong ETag, conditional 304s and byte ranges, so repeat
+downloads cost a header exchange instead of the whole file.
+"""
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header lies entirely outside the archive."""
+
+
+def manifest_path_for(package_path: Path) -> Path:
+    return package_path.with_suffix(".manifest.json")
+
+
+def version_tag(version: str, sha256: str) -> str:
+    """URL segment naming one exact build, e.g. ``1.1.0-3f2a9c1d4b5e``."""
+    return f"{version}-{sha256[:12]}"
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match / If-Range value names ``etag`` (weak comparison)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into an inclusive ``(start, end)``.
+
+    Returns None when the whole archive should be sent: no header, a
+    malformed one, or a multi-range request (which HTTP lets us ignore).
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.group(1), match.group(2)
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class ExtensionPackage:
+    """The current extension archive, reloaded when the file on disk changes."""
+
+    def __init__(self, package_path: Path):
+        self.package_path = package_path
+        self.manifest_path = manifest_path_for(package_path)
+        self.content = b""
+        self.version = ""
+        self.sha256 = ""
+        self.built_at = ""
+        self._stamp = None
+        self.full_responses = 0
+        self.partial_responses = 0
+        self.not_modified = 0
+        self.update_checks = 0
+
+    @property
+    def available(self) -> bool:
+        return bool(self.content)
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256}"'
+
+    @property
+    def tag(self) -> str:
+        return version_tag(self.version, self.sha256)
+
+    def refresh(self):
+        """Reload the archive if it was rebuilt since the last call."""
+        try:
+            stat = self.package_path.stat()
+        except FileNotFoundError:
+            if self._stamp is not None:
+                logger.warning(f"Extension package {self.package_path} was removed")
+            self.content, self.sha256, self._stamp = b"", "", None
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        content = self.package_path.read_bytes()
+        sha256 = hashlib.sha256(content).hexdigest()
+        manifest = {}
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            logger.warning(f"No manifest for {self.package_path}; run build_extension_package.py")
+        except ValueError as e:
+            logger.warning(f"Could not read extension manifest {self.manifest_path}: {e}")
+        if manifest and manifest.get("sha256") != sha256:
+            logger.warning(f"Extension manifest {self.manifest_path} does not match the archive; ignoring it")
+            manifest = {}
+        self.content = content
+        self.sha256 = sha256
+        self.version = manifest.get("version", "0.0.0")
+        self.built_at = manifest.get("built_at", "")
+        self._stamp = stamp
+        logger.info(f"Loaded extension package v{self.version} ({self.size} bytes, sha256 {sha256[:12]})")
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "sha256": self.sha256,
+            "size": self.size,
+            "built_at": self.built_at,
+            "tag": self.tag,
+        }
+
+    def stats(self) -> dict:
+        return {
+            **(self.describe() if self.available else {"version": None}),
+            "full_responses": self.full_responses,
+            "partial_responses": self.partial_responses,
+            "not_modified": self.not_modified,
+            "update_checks": self.update_checks,
+        }
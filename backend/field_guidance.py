@@ -0,0 +1,111 @@
+"""Precomputed, versioned guidance for known form fields.
+
+``build_field_guidance.py`` turns ``data/field_catalogue.json`` into a
+compact gzipped index of FormHelpResponse payloads. The server loads it at
+startup and answers known fields without calling the LLM. Labels are matched
+exactly after canonicalization, then by trigram similarity.
+"""
+import gzip
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from label_matcher import TrigramIndex, canonicalize
+
+logger = logging.getLogger(__name__)
+
+# Index keys are canonical labels
+label_key = canonicalize
+
+
+class FieldGuidanceIndex:
+    """In-memory view of the on-disk field guidance index."""
+
+    def __init__(self, version: int = 0, catalogue_sha256: str = "", built_at: str = "",
+                 contexts: Optional[List[dict]] = None, labels: Optional[Dict[str, Dict[str, str]]] = None,
+                 responses: Optional[Dict[str, dict]] = None, match_threshold: float = 0.7):
+        self.version = version
+        self.catalogue_sha256 = catalogue_sha256
+        self.built_at = built_at
+        self.contexts = contexts or []
+        self.labels = labels or {}
+        self.responses = responses or {}
+        self.fuzzy = {
+            context_id: TrigramIndex.build(keys.items(), threshold=match_threshold)
+            for context_id, keys in self.labels.items()
+        }
+        self.hits = 0
+        self.misses = 0
+        self.exact_matches = 0
+        self.fuzzy_matches = 0
+
+    @classmethod
+    def load(cls, path: Path, match_threshold: float = 0.7) -> "FieldGuidanceIndex":
+        """Load the index from ``path``; a missing or unreadable file yields an empty index."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No field guidance index at {path}; known-field answers disabled")
+            return cls()
+        except Exception as e:
+            logger.warning(f"Could not load field guidance index {path}: {e}")
+            return cls()
+        index = cls(
+            version=data["version"],
+            catalogue_sha256=data.get("catalogue_sha256", ""),
+            built_at=data.get("built_at", ""),
+            contexts=data["contexts"],
+            labels=data["labels"],
+            responses=data["responses"],
+            match_threshold=match_threshold,
+        )
+        logger.info(f"Loaded field guidance index v{index.version} with {len(index.responses)} fields")
+        return index
+
+    def resolve_context(self, form_context: Optional[str]) -> Optional[str]:
+        """Map a free-text form context onto a catalogue context id."""
+        key = label_key(form_context)
+        for context in self.contexts:
+            if any(alias in key for alias in context["aliases"]):
+                return context["id"]
+        return None
+
+    def field_id(self, field_label: str, form_context: Optional[str]) -> Optional[str]:
+        """Map a scraped label onto a canonical ``context/field`` id, or None if unknown."""
+        context_id = self.resolve_context(form_context)
+        if context_id is None:
+            return None
+        key = label_key(field_label)
+        field_id = self.labels.get(context_id, {}).get(key)
+        if field_id:
+            self.exact_matches += 1
+        else:
+            match = self.fuzzy[context_id].match(key) if context_id in self.fuzzy else None
+            if match is None:
+                return None
+            field_id = match[0]
+            self.fuzzy_matches += 1
+        return f"{context_id}/{field_id}"
+
+    def lookup(self, field_id: Optional[str]) -> Optional[dict]:
+        """Return the precomputed response payload for a canonical field id, or None."""
+        response = self.responses.get(field_id) if field_id else None
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "catalogue_sha256": self.catalogue_sha256,
+            "built_at": self.built_at,
+            "fields": len(self.responses),
+            "hits": self.hits,
+            "misses": self.misses,
+            "exact_label_matches": self.exact_matches,
+            "fuzzy_label_matches": self.fuzzy_matches,
+        }
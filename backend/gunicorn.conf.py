@@ -0,0 +1,71 @@
+"""Production entry point: Gunicorn managing Uvicorn workers.
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn.conf.py server:app
+
+Page contexts, synced form state and chat sessions live in each worker's
+memory, so a follow-up request that lands on another worker misses them
+and the client has to resend everything. One worker is the default. More
+workers (``WEB_CONCURRENCY``) are only allowed behind a load balancer that
+pins each client to one worker; set ``STICKY_ROUTING=true`` to confirm
+that it does.
+
+The app is imported once in the master (``preload_app``) so the field
+guidance index, prompts and compiled models are shared copy-on-write by
+every worker. Connections (MongoDB pool, LLM HTTP pool, write-behind
+worker) are opened per worker in the app's startup hooks. Uvicorn picks
+uvloop and httptools automatically when they are installed.
+"""
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from process_stats import peak_rss_bytes, rss_bytes  # noqa: E402
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8001')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+sticky_routing = os.environ.get('STICKY_ROUTING', 'false').lower() == 'true'
+if workers > 1 and not sticky_routing:
+    sys.exit(
+        f"WEB_CONCURRENCY={workers} needs sticky routing: page contexts, form state and chat "
+        "sessions are per worker. Pin clients to one worker and set STICKY_ROUTING=true, "
+        "or run a single worker."
+    )
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# LLM calls can take tens of seconds; don't let the arbiter kill slow workers
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+_master_started = time.monotonic()
+
+
+def when_ready(server):
+    server.log.info(
+        f"Master ready in {time.monotonic() - _master_started:.2f}s "
+        f"(rss {rss_bytes() / 2**20:.1f} MiB, preload={preload_app}, workers={workers})"
+    )
+    # Keep the preloaded heap out of the collector so forked workers don't
+    # touch (and copy) those pages during GC
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    worker.log.info(
+        f"Worker {worker.pid} initialised in {time.monotonic() - worker.forked_at:.2f}s "
+        f"(rss {rss_bytes() / 2**20:.1f} MiB, peak {peak_rss_bytes() / 2**20:.1f} MiB)"
+    )
@@ -0,0 +1,120 @@
+"""Tolerant extraction of the JSON object in an LLM reply.
+
+Models wrap their JSON in code fences or prose, leave trailing commas, and
+sometimes stop mid-object when they hit the output limit. Instead of
+stripping fences and calling ``json.loads`` once, ``extract_json`` scans for
+the first balanced object. If the reply was cut off, it drops the
+unfinished member, closes the brackets after the last complete value and
+flags the result as repaired, so callers can use it without caching it.
+"""
+import json
+import re
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Give up on repairing after this many candidate cut points
+MAX_REPAIR_ATTEMPTS = 64
+
+
+class ExtractedJSON(NamedTuple):
+    value: Optional[dict]
+    repaired: bool = False
+
+
+class _Scan(NamedTuple):
+    end: Optional[int]
+    # Commas outside strings with the bracket stack open at that point,
+    # i.e. places where a truncated reply can be cut and closed
+    cut_points: List[Tuple[int, Tuple[str, ...]]]
+    stack: Tuple[str, ...]
+    in_string: bool
+
+
+def _loads(text: str) -> Any:
+    # strict=False accepts raw newlines inside strings, which models emit
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text), strict=False)
+
+
+def _scan(text: str, start: int) -> _Scan:
+    """Walk the object opening at ``text[start]`` up to its closing brace or the end of text."""
+    stack = ["{"]
+    cut_points = []
+    in_string = escape = False
+    for i in range(start + 1, len(text)):
+        char = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            if _CLOSERS[stack[-1]] != char:
+                continue
+            stack.pop()
+            if not stack:
+                return _Scan(i + 1, cut_points, (), False)
+        elif char == ",":
+            cut_points.append((i, tuple(stack)))
+    return _Scan(None, cut_points, tuple(stack), in_string)
+
+
+def _repair(text: str, start: int, scan: _Scan) -> Optional[dict]:
+    """Close a truncated object after its last complete value, or return None."""
+    candidates = []
+    tail = text[start:].rstrip()
+    # The reply may have stopped right after a finished string or container;
+    # never close a string that was still open, its value is cut short
+    if not scan.in_string and tail.endswith(('"', "}", "]")):
+        candidates.append((tail, scan.stack))
+    for index, stack in reversed(scan.cut_points[-MAX_REPAIR_ATTEMPTS:]):
+        candidates.append((text[start:index], stack))
+
+    for prefix, stack in candidates:
+        closers = "".join(_CLOSERS[opener] for opener in reversed(stack))
+        try:
+            parsed = _loads(prefix.rstrip() + closers)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def extract_json(text: str) -> ExtractedJSON:
+    """Return the first JSON object in ``text`` and whether it had to be repaired."""
+    if not text:
+        return ExtractedJSON(None)
+    position = text.find("{")
+    while position != -1:
+        scan = _scan(text, position)
+        if scan.end is not None:
+            try:
+                parsed = _loads(text[position:scan.end])
+                if isinstance(parsed, dict):
+                    return ExtractedJSON(parsed)
+            except json.JSONDecodeError:
+                pass
+        else:
+            parsed = _repair(text, position, scan)
+            if parsed is not None:
+                return ExtractedJSON(parsed, repaired=True)
+        # A stray brace in leading prose; try the next one
+        position = text.find("{", position + 1)
+    return ExtractedJSON(None)
+
+
+def extract_json_object(text: str) -> Optional[dict]:
+    """Return the first JSON object in ``text``, repairing truncation; None if there is none."""
+    return extract_json(text).value
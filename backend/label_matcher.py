@@ -0,0 +1,123 @@
+"""Canonicalization and fuzzy matching of scraped form field labels.
+
+Labels extracted by the extension arrive with numbering, asterisks, stray
+whitespace and mixed Hindi/English text. ``canonicalize`` applies the
+cleanup rules, and ``TrigramIndex`` maps a canonical label onto the closest
+known label by character-trigram similarity. A close spelling is not
+enough on its own: "Date of Birth of Father" is near "Date of Birth" but
+asks about someone else, so a match must also share every content word
+(allowing for typos) with the known label.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+_NUMBERING_RE = re.compile(
+    r"^\s*(?:q(?:uestion)?\s*)?(?:\(?[0-9]{1,3}[a-z]?\)?|\(?[ivx]{1,4}\)|\(?[a-h]\))[.):\-]?\s+", re.I
+)
+_DEVANAGARI_RE = re.compile(r"[ऀ-ॿ]+")
+_LATIN_RE = re.compile(r"[a-z]")
+# \w misses Devanagari vowel signs and virama, which would split Hindi words
+_NON_WORD_RE = re.compile(r"[^\w\u0900-\u097F]+", re.UNICODE)
+
+# Words that can be added or dropped without changing who or what a label asks about
+_STOPWORDS = frozenset({
+    "a", "an", "and", "any", "applicant", "are", "by", "do", "for", "if", "in", "is",
+    "of", "on", "or", "s", "the", "to", "you", "your",
+})
+# Two words this similar are treated as one word misspelled
+_TYPO_RATIO = 0.8
+
+# Words that vary between portal versions without changing the question
+_ABBREVIATIONS = {
+    "govt": "government",
+    "dob": "date of birth",
+    "num": "number",
+    "parents": "parent",
+}
+
+
+def canonicalize(label: Optional[str]) -> str:
+    """Apply the label cleanup rules and return a canonical lowercase form."""
+    if not label:
+        return ""
+    label = unicodedata.normalize("NFKC", label).strip()
+    label = _NUMBERING_RE.sub("", label).lower()
+    # Bilingual labels ("जन्म तिथि / Date of Birth"): keep the English half
+    if _LATIN_RE.search(label):
+        label = _DEVANAGARI_RE.sub(" ", label)
+    words = _NON_WORD_RE.sub(" ", label).split()
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def content_words(text: str) -> FrozenSet[str]:
+    return frozenset(word for word in text.split() if word not in _STOPWORDS)
+
+
+def _covers(words: FrozenSet[str], other: FrozenSet[str]) -> bool:
+    """Whether every word in ``other`` appears in ``words``, allowing for typos."""
+    return all(
+        word in words or any(SequenceMatcher(None, word, known).ratio() >= _TYPO_RATIO for known in words)
+        for word in other
+    )
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted index from character trigrams to known label ids."""
+
+    def __init__(self, threshold: float = 0.7):
+        self.threshold = threshold
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._sizes: Dict[str, int] = {}
+        self._words: Dict[str, FrozenSet[str]] = {}
+        self._targets: Dict[str, str] = {}
+
+    def add(self, text: str, target: str):
+        """Index canonical ``text`` as a way of referring to ``target``."""
+        grams = trigrams(text)
+        self._sizes[text] = len(grams)
+        self._words[text] = content_words(text)
+        self._targets[text] = target
+        for gram in grams:
+            self._postings[gram].add(text)
+
+    def match(self, text: str) -> Optional[Tuple[str, float]]:
+        """Return ``(target, similarity)`` for the closest known label above the threshold.
+
+        Candidates whose content words differ from the query's (beyond
+        typos) are skipped, however similar their spelling.
+        """
+        grams = trigrams(text)
+        if not grams:
+            return None
+        shared = Counter()
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] += 1
+        # Dice coefficient over trigram sets
+        scored = sorted(
+            ((2 * overlap / (len(grams) + self._sizes[candidate]), candidate) for candidate, overlap in shared.items()),
+            reverse=True,
+        )
+        words = content_words(text)
+        for score, candidate in scored:
+            if score < self.threshold:
+                break
+            known = self._words[candidate]
+            if _covers(known, words) and _covers(words, known):
+                return self._targets[candidate], score
+        return None
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, str]], threshold: float = 0.7) -> "TrigramIndex":
+        index = cls(threshold)
+        for text, target in entries:
+            index.add(text, target)
+        return index
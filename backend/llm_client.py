@@ -0,0 +1,318 @@
+"""Long-lived LLM client shared by every request in a worker.
+
+The provider key and models are resolved once, and every call passes
+admission control so one traffic spike cannot open an unbounded number of
+provider connections. litellm (under emergentintegrations) uses the
+client's keep-alive pool only for OpenAI-compatible routes; other providers,
+Gemini included, go through litellm's own per-provider cached httpx client,
+which is also reused across calls but is not bounded by this pool.
+Calls are routed across the configured models with hedging and circuit
+breakers (see llm_router).
+
+``stream`` calls litellm directly with ``stream=True`` so chat answers can
+be forwarded as the provider produces them; emergentintegrations only
+returns whole replies.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional, Set
+
+import httpx
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+from admission import AdmissionController, LLMOverloaded, LLMUnavailable
+from llm_router import LLMRouter, ModelRoute, parse_model_list
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """Per-worker LLM client with pooled connections and admission control."""
+
+    def __init__(self, api_key: Optional[str], provider: str = "gemini", model: str = "gemini-2.5-flash",
+                 max_concurrency: int = 32, max_keepalive: int = 20,
+                 admission: Optional[AdmissionController] = None, router: Optional[LLMRouter] = None,
+                 streaming: bool = True, stream_api_base: Optional[str] = None):
+        self.api_key = api_key
+        self.router = router or LLMRouter([ModelRoute(provider, model)])
+        self.provider = self.router.primary.provider
+        self.model = self.router.primary.model
+        self.max_concurrency = max_concurrency
+        self.max_keepalive = max_keepalive
+        self.admission = admission or AdmissionController(max_limit=max_concurrency)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.streaming = streaming
+        self.stream_api_base = stream_api_base
+        self.in_flight = 0
+        self.calls = 0
+        self.streams = 0
+        self.stream_fallbacks = 0
+
+    @classmethod
+    def from_env(cls) -> "LLMClient":
+        max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY', '32'))
+        admission = AdmissionController(
+            rate_per_second=float(os.environ.get('LLM_RATE_PER_SECOND', '20')),
+            burst=int(os.environ.get('LLM_RATE_BURST', '40')),
+            initial_limit=min(int(os.environ.get('LLM_INITIAL_CONCURRENCY', '8')), max_concurrency),
+            max_limit=max_concurrency,
+            max_queue=int(os.environ.get('LLM_MAX_QUEUE', '100')),
+            max_wait_seconds=float(os.environ.get('LLM_MAX_QUEUE_WAIT_SECONDS', '10')),
+            latency_target_seconds=float(os.environ.get('LLM_LATENCY_TARGET_SECONDS', '8')),
+        )
+        provider = os.environ.get('LLM_PROVIDER', 'gemini')
+        model = os.environ.get('LLM_MODEL', 'gemini-2.5-flash')
+        # Ordered fallback list, e.g. "gemini:gemini-2.5-flash,gemini:gemini-2.0-flash"
+        routes = parse_model_list(os.environ.get('LLM_MODELS', f"{provider}:{model}"), provider)
+        for route in routes:
+            route.breaker.failure_threshold = int(os.environ.get('LLM_BREAKER_FAILURES', '5'))
+            route.breaker.cooldown_seconds = float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', '30'))
+        router = LLMRouter(
+            routes,
+            hedge_enabled=os.environ.get('LLM_HEDGE_ENABLED', 'true').lower() == 'true',
+            hedge_percentile=float(os.environ.get('LLM_HEDGE_PERCENTILE', '95')),
+            hedge_initial_delay=float(os.environ.get('LLM_HEDGE_INITIAL_DELAY_SECONDS', '5')),
+            hedge_min_delay=float(os.environ.get('LLM_HEDGE_MIN_DELAY_SECONDS', '0.5')),
+        )
+        api_key = os.environ.get('EMERGENT_LLM_KEY')
+        # Emergent universal keys only work through an OpenAI-compatible proxy
+        stream_api_base = os.environ.get('LLM_STREAM_API_BASE') or None
+        streaming = os.environ.get('LLM_STREAMING', 'true').lower() == 'true'
+        if streaming and (api_key or "").startswith("sk-emergent") and not stream_api_base:
+            logger.info("LLM_STREAM_API_BASE is not set for an Emergent key; chat replies will not stream")
+            streaming = False
+        return cls(
+            api_key=api_key,
+            streaming=streaming,
+            stream_api_base=stream_api_base,
+            max_concurrency=max_concurrency,
+            max_keepalive=int(os.environ.get('LLM_MAX_KEEPALIVE', '20')),
+            admission=admission,
+            router=router,
+        )
+
+    def start(self):
+        """Open the keep-alive pool litellm uses for OpenAI-compatible provider calls."""
+        if self._http_client is not None:
+            return
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_keepalive,
+            ),
+            timeout=httpx.Timeout(120.0, connect=10.0),
+        )
+        try:
+            # litellm passes aclient_session to its OpenAI clients only; the
+            # Gemini handler keeps its own cached client (get_async_httpx_client)
+            import litellm
+            litellm.aclient_session = self._http_client
+        except ImportError:
+            logger.info("litellm not available; the OpenAI-compatible connection pool is unused")
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def new_chat(self, system_message: str, session_id: Optional[str] = None,
+                 route: Optional[ModelRoute] = None) -> LlmChat:
+        """Build a lightweight conversation handle on the shared client settings."""
+        if not self.api_key:
+            raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id or f"llm-{uuid.uuid4()}",
+            system_message=system_message
+        )
+        route = route or self.router.primary
+        chat.with_model(route.provider, route.model)
+        return chat
+
+    async def send(self, system_message: str, prompt: str, session_id: Optional[str] = None,
+                   deadline: Optional[float] = None) -> str:
+        """Send one prompt and return the reply text.
+
+        Tries the healthy models in order, hedging a slow call with a second
+        request and failing over when a model errors. Raises
+        ``LLMUnavailable`` when the call is shed by admission control, the
+        provider rate-limits every model, or every breaker is open.
+        """
+        fallbacks = self.router.available()
+        primary = self.router.claim(fallbacks)
+        if primary is None:
+            raise LLMOverloaded("All LLM models are temporarily unavailable", retry_after=self.router.retry_after())
+
+        attempts: Dict[asyncio.Task, ModelRoute] = {}
+        # With one model the hedge goes to the same route, so track tasks
+        hedges: Set[asyncio.Task] = set()
+
+        def launch(route: ModelRoute) -> asyncio.Task:
+            task = asyncio.ensure_future(self._attempt(route, system_message, prompt, session_id, deadline))
+            attempts[task] = route
+            return task
+
+        launch(primary)
+        hedge_delay = self.router.hedge_delay(primary)
+        last_error: Optional[BaseException] = None
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The first call is slower than usual: race a second one
+                    hedge_delay = None
+                    if deadline is not None and time.monotonic() >= deadline:
+                        continue
+                    route = self.router.hedge_target(primary, fallbacks)
+                    if route is not None:
+                        route.hedges += 1
+                        hedges.add(launch(route))
+                    continue
+
+                for task in done:
+                    route = attempts.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if task in hedges:
+                            route.hedge_wins += 1
+                        return task.result()
+                    last_error = error
+                    if isinstance(error, LLMUnavailable) and error.__cause__ is None and not attempts:
+                        # Shed by our own admission control; another model will not help
+                        raise error
+
+                if not attempts:
+                    fallback = self.router.claim(fallbacks)
+                    if fallback is not None:
+                        logger.warning(f"LLM call failed on {route.name}, failing over: {last_error}")
+                        hedge_delay = None
+                        launch(fallback)
+            raise last_error
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    async def _attempt(self, route: ModelRoute, system_message: str, prompt: str,
+                       session_id: Optional[str], deadline: Optional[float]) -> str:
+        """Make one provider call on a claimed ``route``, feeding its latency window and breaker."""
+        admitted = False
+        try:
+            chat = self.new_chat(system_message, session_id, route=route)
+            async with self.admission.admit(deadline):
+                admitted = True
+                self.in_flight += 1
+                self.calls += 1
+                route.calls += 1
+                started = time.monotonic()
+                try:
+                    reply = await chat.send_message(UserMessage(text=prompt))
+                except asyncio.CancelledError:
+                    route.breaker.on_cancel()
+                    raise
+                except Exception:
+                    route.failures += 1
+                    route.breaker.record_failure()
+                    raise
+                finally:
+                    self.in_flight -= 1
+                route.latency.add(time.monotonic() - started)
+                route.breaker.record_success()
+                return reply
+        finally:
+            if not admitted:
+                # Shed or cancelled before reaching the provider: give the probe back
+                route.breaker.on_cancel()
+
+    async def stream(self, system_message: str, prompt: str, session_id: Optional[str] = None,
+                     deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield the reply text in pieces as the provider produces them.
+
+        Streams from the first healthy model. If streaming is disabled, or
+        the stream fails before its first piece, the reply comes from
+        ``send`` (with its hedging and failover) as a single piece.
+        """
+        route = self.router.claim(self.router.available()) if self.streaming else None
+        if route is None:
+            yield await self.send(system_message, prompt, session_id, deadline)
+            return
+
+        started_output = False
+        try:
+            async for piece in self._stream_attempt(route, system_message, prompt, deadline):
+                started_output = True
+                yield piece
+        except LLMUnavailable as e:
+            if started_output or e.__cause__ is None:
+                raise
+            # Provider rate limit: let send() fail over to another model
+            self.stream_fallbacks += 1
+            yield await self.send(system_message, prompt, session_id, deadline)
+        except Exception as e:
+            if started_output:
+                raise
+            logger.warning(f"LLM stream on {route.name} failed before any output, retrying unstreamed: {e}")
+            self.stream_fallbacks += 1
+            yield await self.send(system_message, prompt, session_id, deadline)
+
+    async def _stream_attempt(self, route: ModelRoute, system_message: str, prompt: str,
+                              deadline: Optional[float]) -> AsyncIterator[str]:
+        import litellm
+
+        params = {"api_key": self.api_key}
+        if self.stream_api_base:
+            params.update(api_base=self.stream_api_base, custom_llm_provider="openai")
+        admitted = False
+        try:
+            async with self.admission.admit(deadline):
+                admitted = True
+                self.in_flight += 1
+                self.calls += 1
+                self.streams += 1
+                route.calls += 1
+                started = time.monotonic()
+                try:
+                    response = await litellm.acompletion(
+                        model=f"{route.provider}/{route.model}",
+                        messages=[
+                            {"role": "system", "content": system_message},
+                            {"role": "user", "content": prompt},
+                        ],
+                        stream=True,
+                        **params
+                    )
+                    async for chunk in response:
+                        piece = chunk.choices[0].delta.content if chunk.choices else None
+                        if piece:
+                            yield piece
+                except (asyncio.CancelledError, GeneratorExit):
+                    route.breaker.on_cancel()
+                    raise
+                except Exception:
+                    route.failures += 1
+                    route.breaker.record_failure()
+                    raise
+                finally:
+                    self.in_flight -= 1
+                route.latency.add(time.monotonic() - started)
+                route.breaker.record_success()
+        finally:
+            if not admitted:
+                # Shed or cancelled before reaching the provider: give the probe back
+                route.breaker.on_cancel()
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "calls": self.calls,
+            "streaming": self.streaming,
+            "streams": self.streams,
+            "stream_fallbacks": self.stream_fallbacks,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "admission": self.admission.stats(),
+            "routing": self.router.stats(),
+        }
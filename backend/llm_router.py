@@ -0,0 +1,182 @@
+"""Model routing for LLM calls: latency tracking, circuit breakers and hedging.
+
+``LLMClient`` sends each prompt to the first healthy model in the configured
+list. If it has not answered by that model's recent latency percentile, a
+hedged request goes to the next model (or to the same model when only one is
+configured) and whichever answers first wins. Models that keep failing are
+skipped until their circuit breaker cools down.
+"""
+import time
+from collections import deque
+from typing import List, Optional
+
+
+def parse_model_list(value: str, default_provider: str) -> List["ModelRoute"]:
+    """Parse ``provider:model,provider:model`` (provider optional) into routes."""
+    routes = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        provider, _, model = item.rpartition(":")
+        routes.append(ModelRoute(provider or default_provider, model))
+    return routes
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self.samples: deque = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one probe through after a cooldown."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def available(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        return self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self.probe_in_flight)
+
+    def claim(self) -> bool:
+        """Reserve a call when the route is chosen; half-open lets only one probe through."""
+        if not self.available():
+            return False
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = True
+        return True
+
+    def on_cancel(self):
+        self.probe_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.cooldown_seconds - (time.monotonic() - self.opened_at))
+
+
+class ModelRoute:
+    """One provider/model pair with its own latency window and breaker."""
+
+    def __init__(self, provider: str, model: str, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.provider = provider
+        self.model = model
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(failure_threshold, cooldown_seconds)
+        self.calls = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    def stats(self) -> dict:
+        p50, p95 = self.latency.percentile(50), self.latency.percentile(95)
+        return {
+            "model": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+        }
+
+
+class LLMRouter:
+    """Ordered model list plus the hedging policy."""
+
+    def __init__(self, routes: List[ModelRoute], hedge_enabled: bool = True, hedge_percentile: float = 95.0,
+                 hedge_initial_delay: float = 5.0, hedge_min_delay: float = 0.5, min_samples: int = 20):
+        if not routes:
+            raise ValueError("At least one LLM model must be configured")
+        self.routes = routes
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.min_samples = min_samples
+
+    @property
+    def primary(self) -> ModelRoute:
+        return self.routes[0]
+
+    def available(self) -> List[ModelRoute]:
+        """Routes whose breaker currently admits a call, in preference order."""
+        return [route for route in self.routes if route.breaker.available()]
+
+    def claim(self, candidates: List[ModelRoute]) -> Optional[ModelRoute]:
+        """Pop routes off ``candidates`` until one's breaker admits the call."""
+        while candidates:
+            route = candidates.pop(0)
+            if route.breaker.claim():
+                return route
+        return None
+
+    def retry_after(self) -> float:
+        """Seconds until the first open breaker lets a probe through."""
+        return min(route.breaker.retry_after() for route in self.routes)
+
+    def hedge_delay(self, route: ModelRoute) -> Optional[float]:
+        """How long to wait on ``route`` before hedging, or None to never hedge."""
+        if not self.hedge_enabled:
+            return None
+        if len(route.latency.samples) < self.min_samples:
+            return self.hedge_initial_delay
+        return max(self.hedge_min_delay, route.latency.percentile(self.hedge_percentile))
+
+    def hedge_target(self, primary: ModelRoute, fallbacks: List[ModelRoute]) -> Optional[ModelRoute]:
+        """Claim the route for a hedged request: the next healthy model, else a replica of ``primary``."""
+        route = self.claim(fallbacks)
+        if route is not None:
+            return route
+        if len(self.routes) == 1 and primary.breaker.state == CircuitBreaker.CLOSED:
+            return primary
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_percentile": self.hedge_percentile,
+            "models": [route.stats() for route in self.routes],
+        }
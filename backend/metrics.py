@@ -0,0 +1,207 @@
+"""Hot-path instrumentation exposed in the Prometheus text format.
+
+Handlers time their stages with ``stage("llm")`` and tag the request with an
+outcome (``knowledge_base``, ``cache``, ``llm``, ...). ``MetricsMiddleware``
+opens a per-request trace, records the end-to-end latency once the response
+body has been sent, and can add a ``Server-Timing`` header listing the
+stages. ``registry.render()`` produces the /api/metrics payload.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from context_builder import estimate_tokens
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {total[0]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    "formwise_request_duration_seconds", "End-to-end request latency, including streamed bodies.",
+    ("endpoint", "outcome", "status"))
+STAGE_DURATION = registry.histogram(
+    "formwise_stage_duration_seconds", "Time spent in each stage of a request.", ("endpoint", "stage"))
+PROMPT_TOKENS = registry.histogram(
+    "formwise_llm_prompt_tokens", "Estimated tokens sent to the LLM per call.", ("endpoint",), TOKEN_BUCKETS)
+RESPONSE_TOKENS = registry.histogram(
+    "formwise_llm_response_tokens", "Estimated tokens received from the LLM per call.", ("endpoint",), TOKEN_BUCKETS)
+PROMPT_BYTES = registry.histogram(
+    "formwise_llm_prompt_bytes", "UTF-8 size of the prompt sent to the LLM.", ("endpoint",), BYTE_BUCKETS)
+RESPONSE_BYTES = registry.histogram(
+    "formwise_llm_response_bytes", "UTF-8 size of the LLM reply.", ("endpoint",), BYTE_BUCKETS)
+REQUESTS = registry.counter(
+    "formwise_requests_total", "Requests by endpoint, outcome and status.", ("endpoint", "outcome", "status"))
+
+
+class RequestTrace:
+    """Stage timings and outcome of one in-flight request."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.outcome = "none"
+        self.stages: List[Tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float):
+        self.stages.append((name, seconds))
+        STAGE_DURATION.observe(seconds, self.endpoint, name)
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("formwise_request_trace", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage ``name`` of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = _current.get()
+        if trace is not None:
+            trace.record(name, time.perf_counter() - started)
+
+
+def set_outcome(outcome: str):
+    """Label the current request with how it was answered."""
+    trace = _current.get()
+    if trace is not None:
+        trace.outcome = outcome
+
+
+def observe_llm_call(prompt: str, reply: str):
+    """Record prompt and reply sizes for an LLM round-trip."""
+    trace = _current.get()
+    endpoint = trace.endpoint if trace is not None else "unknown"
+    PROMPT_TOKENS.observe(estimate_tokens(prompt), endpoint)
+    RESPONSE_TOKENS.observe(estimate_tokens(reply), endpoint)
+    PROMPT_BYTES.observe(len(prompt.encode("utf-8", "replace")), endpoint)
+    RESPONSE_BYTES.observe(len(reply.encode("utf-8", "replace")), endpoint)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that traces requests to ``paths`` and records their latency."""
+
+    def __init__(self, app, paths: Sequence[str], server_timing: bool = False):
+        self.app = app
+        self.paths = set(paths)
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["path"])
+        token = _current.set(trace)
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                if self.server_timing:
+                    header = trace.server_timing(time.perf_counter() - started)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            REQUEST_DURATION.observe(time.perf_counter() - started, trace.endpoint, trace.outcome, status)
+            REQUESTS.inc(trace.endpoint, trace.outcome, status)
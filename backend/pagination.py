@@ -0,0 +1,45 @@
+"""Keyset (cursor) pagination over timestamp-ordered collections.
+
+Pages are ordered newest first by ``(timestamp, id)``. The cursor is an
+opaque token naming the last document of the previous page, so each page is
+an index range scan instead of an ever-growing skip.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["timestamp"].isoformat(), doc["id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        timestamp, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), doc_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+async def fetch_page(collection, limit: int, cursor: Optional[str] = None, query: Optional[dict] = None,
+                     projection: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """Return one page of documents and the cursor for the next page (None on the last page)."""
+    query = dict(query or {})
+    if cursor:
+        timestamp, doc_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": doc_id}},
+        ]
+
+    docs = await collection.find(query, projection or {"_id": 0}) \
+        .sort([("timestamp", -1), ("id", -1)]) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
+
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
@@ -1,33 +1,163 @@
-from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
+import socket
+import asyncio
 import json
+import time
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
+from typing import AsyncIterator, List, Optional, Tuple
 import uuid
-from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from datetime import datetime, timedelta, timezone
+from answer_cache import AnswerCache, make_cache_key
+from single_flight import SingleFlight, prompt_key
+from llm_client import LLMClient
+from admission import LLMUnavailable
+from deadlines import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    current_deadline,
+    record_disconnect,
+    resolve_deadline,
+    run_request,
+    set_deadline,
+    stats as deadline_stats,
+    within_deadline,
+)
+from write_behind import WriteBehindQueue
+from analytics import AnalyticsRollup
+from pagination import fetch_page
+from context_builder import ChunkedPage, ContextBudget, build_context_sections, estimate_tokens
+from context_store import FormStateMissing, FormStateStore, PageContextMissing, PageContextStore
+from field_guidance import FieldGuidanceIndex
+from doc_index import DocIndex
+from extension_package import ExtensionPackage, RangeNotSatisfiable, etag_matches, parse_range
+from session_store import ChatSession, SessionMissing, SessionStore
+from json_extract import extract_json
+from process_stats import event_loop_name, peak_rss_bytes, rss_bytes
+from metrics import MetricsMiddleware, observe_llm_call, registry as metrics_registry, set_outcome, stage
+
+IMPORT_STARTED = time.monotonic()
 
 ROOT_DIR = Path(__file__).parent
 APP_DIR = ROOT_DIR.parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection. connect=False defers opening the pool to the first
+# operation, so the app can be preloaded before Gunicorn forks its workers.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, connect=False)
 db = client[os.environ['DB_NAME']]
 
+# Precomputed guidance for known form fields, built by build_field_guidance.py
+field_guidance = FieldGuidanceIndex.load(
+    Path(os.environ.get('FIELD_GUIDANCE_INDEX', ROOT_DIR / 'data' / 'field_guidance.json.gz')),
+    match_threshold=float(os.environ.get('FIELD_MATCH_THRESHOLD', '0.7'))
+)
+
+# Shared answer cache for /api/form-help
+answer_cache = AnswerCache(
+    db.form_help_cache,
+    max_entries=int(os.environ.get('FORM_HELP_CACHE_SIZE', '2048')),
+    ttl_seconds=int(os.environ.get('FORM_HELP_CACHE_TTL_SECONDS', '86400'))
+)
+
+# History logging is written behind the response in batches
+history_writer = WriteBehindQueue(
+    db,
+    max_batch=int(os.environ.get('HISTORY_WRITE_BATCH_SIZE', '100')),
+    flush_interval=float(os.environ.get('HISTORY_WRITE_FLUSH_SECONDS', '0.5')),
+    max_buffer=int(os.environ.get('HISTORY_WRITE_BUFFER_SIZE', '10000')),
+    overflow_policy=os.environ.get('HISTORY_WRITE_OVERFLOW_POLICY', 'drop_oldest')
+)
+
+# Token budget for page text, form values and history in /api/chat prompts
+CHAT_CONTEXT_BUDGET = ContextBudget(
+    total_tokens=int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', '2500'))
+)
+
+# Parsed page contexts, addressed by the hash of their text. Pages are
+# chunked and indexed on the event loop, so their size is capped.
+PAGE_TEXT_MAX_CHARS = int(os.environ.get('PAGE_TEXT_MAX_CHARS', '200000'))
+page_context_store = PageContextStore(
+    max_entries=int(os.environ.get('PAGE_CONTEXT_CACHE_SIZE', '1000'))
+)
+
+# Form values synced incrementally by the extension, per form sync id
+form_state_store = FormStateStore(
+    max_entries=int(os.environ.get('FORM_STATE_CACHE_SIZE', '5000')),
+    ttl_seconds=int(os.environ.get('FORM_STATE_TTL_SECONDS', '3600'))
+)
+
+# Retrieval over official form instructions (built by build_doc_index.py)
+doc_index = DocIndex.load(Path(os.environ.get('DOC_INDEX_DIR', ROOT_DIR / 'data' / 'doc_index')))
+DOC_RETRIEVAL_TOP_K = int(os.environ.get('DOC_RETRIEVAL_TOP_K', '3'))
+DOC_RETRIEVAL_MIN_SCORE = float(os.environ.get('DOC_RETRIEVAL_MIN_SCORE', '0.15'))
+DOC_CONTEXT_TOKEN_BUDGET = int(os.environ.get('DOC_CONTEXT_TOKEN_BUDGET', '500'))
+
+# Downloadable extension archive (built by build_extension_package.py)
+extension_package = ExtensionPackage(
+    Path(os.environ.get('EXTENSION_PACKAGE_PATH', APP_DIR / 'formwise-extension.zip'))
+)
+extension_package.refresh()
+EXTENSION_UPDATE_CHECK_MAX_AGE = int(os.environ.get('EXTENSION_UPDATE_CHECK_MAX_AGE', '300'))
+
+# Rollups of the history logs that drive answer cache refreshes
+analytics_rollup = AnalyticsRollup(
+    db,
+    window_days=int(os.environ.get('ANALYTICS_WINDOW_DAYS', '7')),
+    top_fields=int(os.environ.get('ANALYTICS_TOP_FIELDS', '50')),
+    top_questions=int(os.environ.get('ANALYTICS_TOP_QUESTIONS', '20'))
+)
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = int(os.environ.get('ANALYTICS_ROLLUP_INTERVAL_SECONDS', '3600'))
+# After each rollup, re-ask the LLM for top fields whose cached answer is
+# missing or expires before the next run
+CACHE_REFRESH_LIMIT = int(os.environ.get('CACHE_REFRESH_LIMIT', '200'))
+CACHE_REFRESH_WITHIN_SECONDS = float(os.environ.get('CACHE_REFRESH_WITHIN_SECONDS', str(2 * ANALYTICS_ROLLUP_INTERVAL_SECONDS)))
+CACHE_REFRESH_CONCURRENCY = int(os.environ.get('CACHE_REFRESH_CONCURRENCY', '2'))
+CACHE_REFRESH_TIMEOUT_SECONDS = float(os.environ.get('CACHE_REFRESH_TIMEOUT_SECONDS', '300'))
+
+# Chat conversations: recent turns verbatim plus a rolling summary of older ones
+chat_sessions = SessionStore(
+    max_sessions=int(os.environ.get('CHAT_SESSION_CACHE_SIZE', '10000')),
+    ttl_seconds=int(os.environ.get('CHAT_SESSION_TTL_SECONDS', '3600')),
+    max_turns=int(os.environ.get('CHAT_SESSION_MAX_TURNS', '6')),
+    memory_tokens=int(os.environ.get('CHAT_SESSION_MEMORY_TOKENS', '200'))
+)
+
+# Batch pre-fetch limits for /api/form-help/batch
+FORM_HELP_BATCH_MAX_FIELDS = int(os.environ.get('FORM_HELP_BATCH_MAX_FIELDS', '50'))
+FORM_HELP_BATCH_CONCURRENCY = int(os.environ.get('FORM_HELP_BATCH_CONCURRENCY', '4'))
+
+# Per-endpoint timeout budgets; clients may ask for less (see deadlines.py)
+FORM_HELP_TIMEOUT_SECONDS = float(os.environ.get('FORM_HELP_TIMEOUT_SECONDS', '30'))
+FORM_HELP_BATCH_TIMEOUT_SECONDS = float(os.environ.get('FORM_HELP_BATCH_TIMEOUT_SECONDS', '120'))
+CHAT_TIMEOUT_SECONDS = float(os.environ.get('CHAT_TIMEOUT_SECONDS', '60'))
+
+# One pooled LLM client per worker
+llm_client = LLMClient.from_env()
+
+# Identical concurrent LLM prompts share one in-flight call
+llm_single_flight = SingleFlight()
+
+# Add a Server-Timing header with per-stage durations to instrumented responses
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'false').lower() == 'true'
+
 # Create the main app without a prefix
 app = FastAPI()
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Per-worker startup measurements, reported by /api/worker/stats
+worker_startup = {"pid": None, "startup_seconds": None, "rss_bytes_after_startup": None}
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -50,6 +180,7 @@ class FormHelpRequest(BaseModel):
     field_type: Optional[str] = "input"
     field_options: Optional[str] = ""
     form_context: Optional[str] = "Indian Passport Application Form"
+    timeout_ms: Optional[int] = None  # Same as the X-Request-Timeout-Ms header
 
 class QuestionOption(BaseModel):
     label: str
@@ -65,11 +196,24 @@ class FormHelpResponse(BaseModel):
     field_label: str
     recommended_value: Optional[str] = None
 
+class FormHelpBatchRequest(BaseModel):
+    fields: List[FormHelpRequest]
+    timeout_ms: Optional[int] = None
+
 class ChatHistory(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str
     field_label: str
+    field_type: Optional[str] = None
+    field_options: Optional[str] = None
+    form_context: Optional[str] = None
+    source: Optional[str] = None
+    # Answered ahead of time by /form-help/batch rather than on request
+    prefetch: bool = False
+    # Answer cache entry the response was served from or stored under
+    cache_key: Optional[str] = None
+    llm_ms: Optional[float] = None
     response: dict
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -77,7 +221,14 @@ class PageContext(BaseModel):
     page_title: Optional[str] = ""
     page_url: Optional[str] = ""
     form_data: Optional[dict] = {}
-    page_text: Optional[str] = ""
+    page_text: Optional[str] = Field("", max_length=PAGE_TEXT_MAX_CHARS)
+    page_text_hash: Optional[str] = None  # SHA-256 of page_text; sent alone once the server has the text
+    # Incremental form sync: form_data is a full snapshot, or form_data_delta
+    # holds the fields changed since form_base_version (None removes a field)
+    form_sync_id: Optional[str] = None
+    form_data_delta: Optional[dict] = None
+    form_base_version: Optional[int] = None
+    form_version: Optional[int] = None
 
 class ChatMessage(BaseModel):
     role: str  # 'user' or 'assistant'
@@ -87,19 +238,17 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     page_context: PageContext
+    session_id: Optional[str] = None  # Returned by the first reply; later turns need not resend chat_history
     chat_history: List[ChatMessage] = []
+    timeout_ms: Optional[int] = None  # Same as the X-Request-Timeout-Ms header
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-# LLM Chat setup
-def get_llm_chat(session_id: str) -> LlmChat:
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    if not api_key:
-        raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
-    
-    system_message = """You are an expert Indian Government document consultant helping users fill the Passport Seva application form.
+# LLM prompts, built once per worker
+FORM_HELP_SYSTEM_MESSAGE = """You are an expert Indian Government document consultant helping users fill the Passport Seva application form.
 
 Your job is to help users understand form questions and advise which option to select based on their situation.
 
@@ -123,14 +272,27 @@ Examples:
 - For "Employment Type" dropdown → Ask about current occupation → Recommend appropriate option
 
 Always return valid JSON only, no markdown."""
-    
-    chat = LlmChat(
-        api_key=api_key,
-        session_id=session_id,
-        system_message=system_message
-    )
-    chat.with_model("gemini", "gemini-2.5-flash")
-    return chat
+
+CHAT_SYSTEM_MESSAGE_TEMPLATE = """You are an expert assistant helping users fill out the Indian Passport Seva application form and other government forms.
+
+You have access to the current webpage context including:
+- Page Title: {page_title}
+- Page URL: {page_url}
+- Visible form fields and their current values
+- All instructions, terms, and help text on the page
+
+Your role:
+1. Answer questions about the form fields, requirements, and process
+2. Explain what documents are needed
+3. Help users understand confusing terminology
+4. Guide them through the application process step-by-step
+5. Clarify eligibility criteria and requirements
+6. Explain consequences of different choices
+
+Use the page context to give accurate, specific answers. Reference specific sections or fields from the page when relevant.
+Be concise, helpful, and friendly. If you don't see information on the page about their question, tell them clearly.
+
+Always prioritize accuracy and cite information from official sources when possible."""
 
 # Routes
 @api_router.get("/")
@@ -142,31 +304,93 @@ async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     _ = await db.status_checks.insert_one(doc)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+async def get_status_checks(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Get status checks, newest first. The next page cursor is returned in X-Next-Cursor."""
+    status_checks, next_cursor = await fetch_page(db.status_checks, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return status_checks
 
-@api_router.post("/form-help", response_model=FormHelpResponse)
-async def get_form_help(request: FormHelpRequest):
-    """Get AI-powered guidance for a specific form field."""
-    try:
-        session_id = f"form-helper-{uuid.uuid4()}"
-        chat = get_llm_chat(session_id)
-        
-        # Build prompt with detected options if available
-        options_info = ""
-        if request.field_options:
-            options_info = f"\nDetected form options: {request.field_options}"
-        
-        user_prompt = f"""User needs help with this form question:
+async def save_form_help_history(session_id: str, request: FormHelpRequest, result: FormHelpResponse,
+                                 source: str, llm_ms: Optional[float] = None, prefetch: bool = False,
+                                 cache_key: Optional[str] = None):
+    """Log a form help answer, and how it was produced, to the history collection."""
+    history_entry = ChatHistory(
+        session_id=session_id,
+        field_label=request.field_label,
+        field_type=request.field_type,
+        field_options=request.field_options,
+        form_context=request.form_context,
+        source=source,
+        prefetch=prefetch,
+        cache_key=cache_key,
+        llm_ms=llm_ms,
+        response=result.model_dump()
+    )
+    doc = history_entry.model_dump()
+    with stage("history"):
+        await history_writer.put("form_help_history", doc)
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def llm_unavailable_response(e: LLMUnavailable) -> HTTPException:
+    """Map a shed or rate-limited LLM call to a clean 429/503 response."""
+    logger.warning(f"LLM call rejected ({e.status_code}): {e}")
+    set_outcome("rejected")
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def deadline_exceeded_response() -> HTTPException:
+    set_outcome("timeout")
+    return HTTPException(
+        status_code=504,
+        detail={"code": "deadline_exceeded", "detail": "The answer was not ready before the request deadline"}
+    )
+
+def client_disconnected_response() -> HTTPException:
+    """The client is gone; the status (nginx's 499) only shows up in logs and metrics."""
+    set_outcome("cancelled")
+    return HTTPException(status_code=499, detail="Client closed request")
+
+def check_llm_admission():
+    """Shed the request now if admission control could not admit it before its own deadline."""
+    error = llm_client.admission.would_shed(current_deadline())
+    if error is not None:
+        raise error
+
+async def call_llm(system_message: str, prompt: str, session_id: str) -> str:
+    """Send one prompt to the LLM and record its prompt/reply sizes.
+
+    Calls are shared between coalesced requests, so they run without the
+    first caller's deadline. Each caller checks admission against its own
+    deadline first (``check_llm_admission``), stops waiting when it passes,
+    and single-flight cancels the call once the last one has left.
+    """
+    reply = await llm_client.send(system_message, prompt, session_id)
+    observe_llm_call(system_message + prompt, reply)
+    return reply
+
+def build_form_help_prompt(request: FormHelpRequest) -> str:
+    """Build the user prompt for a form help request."""
+    # Build prompt with detected options if available
+    options_info = ""
+    if request.field_options:
+        options_info = f"\nDetected form options: {request.field_options}"
+    
+    return f"""User needs help with this form question:
 Question/Field: "{request.field_label}"
 Field type: {request.field_type}{options_info}
 Form: {request.form_context}
@@ -174,201 +398,687 @@ Form: {request.form_context}
 Provide guidance on how to answer this question. If it's a Yes/No question or dropdown, ask a clarifying question to help them decide which option to select.
 
 Return JSON with needs_interaction, clarification_question, question_options (with label, value, recommendation), advice, and warning."""
-        
-        user_message = UserMessage(text=user_prompt)
-        response = await chat.send_message(user_message)
-        
-        # Parse the JSON response
-        try:
-            # Clean up the response - remove markdown code blocks if present
-            cleaned_response = response.strip()
-            if cleaned_response.startswith("```json"):
-                cleaned_response = cleaned_response[7:]
-            if cleaned_response.startswith("```"):
-                cleaned_response = cleaned_response[3:]
-            if cleaned_response.endswith("```"):
-                cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-            
-            parsed = json.loads(cleaned_response)
-            
-            # Parse question options if present
-            question_options = []
-            if parsed.get("needs_interaction") and "question_options" in parsed and isinstance(parsed["question_options"], list):
-                for opt in parsed["question_options"]:
-                    question_options.append(QuestionOption(
-                        label=opt.get("label", ""),
-                        value=opt.get("value", ""),
-                        recommendation=opt.get("recommendation", "")
-                    ))
-            
-            result = FormHelpResponse(
-                needs_interaction=parsed.get("needs_interaction", False),
-                clarification_question=parsed.get("clarification_question"),
-                question_options=question_options,
-                advice=parsed.get("advice", "Enter the required information accurately."),
-                warning=parsed.get("warning", "Double-check for any typos before submitting."),
-                field_label=request.field_label,
-                recommended_value=parsed.get("recommended_value")
-            )
-            
-            # Save to history
-            history_entry = ChatHistory(
-                session_id=session_id,
-                field_label=request.field_label,
-                response=result.model_dump()
-            )
-            doc = history_entry.model_dump()
-            doc['timestamp'] = doc['timestamp'].isoformat()
-            await db.form_help_history.insert_one(doc)
-            
-            return result
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI response: {response}, error: {e}")
-            # Return fallback response
-            return FormHelpResponse(
-                needs_interaction=False,
-                clarification_question=None,
-                question_options=[],
-                advice="Enter the required details as per your official documents.",
-                warning="Ensure accuracy to avoid application rejection.",
-                field_label=request.field_label,
-                recommended_value=None
-            )
-            
+
+def form_help_cache_key(request: FormHelpRequest, field_id: Optional[str]) -> str:
+    """Answer cache key for a request; known fields share one entry across label variants."""
+    return make_cache_key(
+        field_id or request.field_label,
+        request.field_type,
+        request.field_options,
+        request.form_context
+    )
+
+def parse_form_help_response(response: str, field_label: str) -> Tuple[Optional[FormHelpResponse], bool]:
+    """Parse the model's JSON answer into ``(result, complete)``.
+    
+    Tolerates code fences, surrounding prose, trailing commas and replies
+    truncated mid-object (see json_extract). ``result`` is None if the reply
+    holds no usable object. ``complete`` is False for a repaired (truncated)
+    object, one without advice or a clarification question, or an
+    interactive answer that lost all its options; such answers can be shown
+    once but must not be cached.
+    """
+    parsed, repaired = extract_json(response)
+    if parsed is None:
+        logger.error(f"Failed to parse AI response: {response}")
+        return None, False
+    
+    # Parse question options if present
+    question_options = []
+    if parsed.get("needs_interaction") and "question_options" in parsed and isinstance(parsed["question_options"], list):
+        for opt in parsed["question_options"]:
+            if not isinstance(opt, dict) or not opt.get("label") or "value" not in opt:
+                continue
+            question_options.append({
+                "label": opt.get("label", ""),
+                "value": opt.get("value", ""),
+                "recommendation": opt.get("recommendation", "")
+            })
+    
+    needs_interaction = bool(parsed.get("needs_interaction", False))
+    complete = not repaired and bool(parsed.get("advice") or parsed.get("clarification_question"))
+    if needs_interaction and not question_options:
+        # Nothing to choose from; show the advice alone
+        needs_interaction = False
+        complete = False
+    if not complete:
+        logger.warning(f"Incomplete AI response for '{field_label}' will not be cached: {response}")
+    
+    try:
+        result = FormHelpResponse(
+            needs_interaction=needs_interaction,
+            clarification_question=parsed.get("clarification_question"),
+            question_options=question_options,
+            advice=parsed.get("advice") or "Enter the required information accurately.",
+            warning=parsed.get("warning") or "Double-check for any typos before submitting.",
+            field_label=field_label,
+            recommended_value=parsed.get("recommended_value")
+        )
+    except ValidationError as e:
+        logger.error(f"AI response did not match FormHelpResponse: {parsed}, error: {e}")
+        return None, False
+    return result, complete
+
+async def generate_form_help(request: FormHelpRequest,
+                             session_id: str) -> Tuple[Optional[FormHelpResponse], bool, float]:
+    """Ask the LLM about a field; returns the parsed answer, whether it is complete, and the LLM time."""
+    with stage("prompt"):
+        user_prompt = build_form_help_prompt(request)
+    started = time.perf_counter()
+    with stage("llm"):
+        check_llm_admission()
+        response = await llm_single_flight.do(
+            prompt_key("form-help", user_prompt),
+            lambda: call_llm(FORM_HELP_SYSTEM_MESSAGE, user_prompt, session_id)
+        )
+    llm_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    with stage("parse"):
+        result, complete = parse_form_help_response(response, request.field_label)
+    return result, complete, llm_ms
+
+async def answer_form_help(request: FormHelpRequest, prefetch: bool = False) -> FormHelpResponse:
+    """Answer a form help request from the knowledge base, the cache or the LLM.
+
+    ``prefetch`` marks answers requested by /form-help/batch in the history
+    log; the extension shows those without calling /form-help again.
+    """
+    session_id = f"form-helper-{uuid.uuid4()}"
+    
+    # Map noisy scraped labels onto canonical field ids, then answer known
+    # fields from the precomputed knowledge base
+    with stage("knowledge_base"):
+        field_id = field_guidance.field_id(request.field_label, request.form_context)
+        known = field_guidance.lookup(field_id)
+    if known is not None:
+        set_outcome("knowledge_base")
+        result = FormHelpResponse(**{**known, "field_label": request.field_label})
+        await save_form_help_history(session_id, request, result, "knowledge_base", prefetch=prefetch)
+        return result
+    
+    # Serve repeated questions from the answer cache
+    cache_key = form_help_cache_key(request, field_id)
+    with stage("cache"):
+        cached = await answer_cache.get(cache_key)
+    if cached is not None:
+        set_outcome("cache")
+        result = FormHelpResponse(**{**cached, "field_label": request.field_label})
+        await save_form_help_history(session_id, request, result, "cache", prefetch=prefetch, cache_key=cache_key)
+        return result
+    
+    result, complete, llm_ms = await generate_form_help(request, session_id)
+    if result is None:
+        set_outcome("fallback")
+        # Return fallback response
+        return FormHelpResponse(
+            needs_interaction=False,
+            clarification_question=None,
+            question_options=[],
+            advice="Enter the required details as per your official documents.",
+            warning="Ensure accuracy to avoid application rejection.",
+            field_label=request.field_label,
+            recommended_value=None
+        )
+    
+    if not complete:
+        # Serve it this once, but keep it out of the cache and its refreshes
+        set_outcome("partial")
+        await save_form_help_history(session_id, request, result, "llm_partial", llm_ms, prefetch)
+        return result
+    
+    set_outcome("llm")
+    with stage("cache_write"):
+        await answer_cache.set(cache_key, result.model_dump())
+    await save_form_help_history(session_id, request, result, "llm", llm_ms, prefetch, cache_key)
+    
+    return result
+
+@api_router.post("/form-help", response_model=FormHelpResponse)
+async def get_form_help(request: FormHelpRequest, http_request: Request):
+    """Get AI-powered guidance for a specific form field."""
+    deadline = resolve_deadline(http_request, FORM_HELP_TIMEOUT_SECONDS, request.timeout_ms)
+    try:
+        return await run_request(http_request, answer_form_help(request), deadline)
+    except DeadlineExceeded:
+        raise deadline_exceeded_response()
+    except ClientDisconnected:
+        raise client_disconnected_response()
+    except LLMUnavailable as e:
+        raise llm_unavailable_response(e)
     except Exception as e:
         logger.error(f"Error getting form help: {e}")
+        set_outcome("error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/form-help/batch")
+async def get_form_help_batch(request: FormHelpBatchRequest, http_request: Request):
+    """Pre-fetch guidance for every field on a form page.
+    
+    Fields are answered with bounded concurrency and streamed back as
+    Server-Sent Events: one ``field`` (or ``field_error``) event per field as
+    soon as it is ready, then a ``done`` event. Batches over
+    FORM_HELP_BATCH_MAX_FIELDS are rejected with 422.
+    """
+    fields = request.fields
+    if len(fields) > FORM_HELP_BATCH_MAX_FIELDS:
+        set_outcome("too_many_fields")
+        raise HTTPException(
+            status_code=422,
+            detail={"code": "too_many_fields", "fields": len(fields), "max_fields": FORM_HELP_BATCH_MAX_FIELDS}
+        )
+    deadline = resolve_deadline(http_request, FORM_HELP_BATCH_TIMEOUT_SECONDS, request.timeout_ms)
+    semaphore = asyncio.Semaphore(FORM_HELP_BATCH_CONCURRENCY)
+    
+    async def answer(index: int, field: FormHelpRequest):
+        async with semaphore:
+            try:
+                result = await answer_form_help(field, prefetch=True)
+                return sse_event("field", {"index": index, "response": result.model_dump()})
+            except LLMUnavailable as e:
+                return sse_event("field_error", {
+                    "index": index,
+                    "field_label": field.field_label,
+                    "detail": str(e),
+                    "status": e.status_code,
+                    "retry_after": e.retry_after
+                })
+            except Exception as e:
+                logger.error(f"Error getting batch form help for '{field.field_label}': {e}")
+                return sse_event("field_error", {"index": index, "field_label": field.field_label, "detail": str(e)})
+    
+    async def event_stream():
+        set_deadline(deadline)
+        tasks = [asyncio.create_task(answer(i, field)) for i, field in enumerate(fields)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await within_deadline(next_done, deadline)
+            set_outcome("batch")
+            yield sse_event("done", {"count": len(fields)})
+        except DeadlineExceeded:
+            set_outcome("timeout")
+            pending = sum(1 for task in tasks if not task.done())
+            yield sse_event("error", {"code": "deadline_exceeded", "status": 504, "pending": pending})
+        except asyncio.CancelledError:
+            record_disconnect()
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/form-help/history")
-async def get_form_help_history(limit: int = 10):
-    """Get recent form help queries."""
-    history = await db.form_help_history.find(
-        {}, 
-        {"_id": 0}
-    ).sort("timestamp", -1).to_list(limit)
+async def get_form_help_history(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session_id: Optional[str] = None
+):
+    """Get recent form help queries. The next page cursor is returned in X-Next-Cursor."""
+    query = {"session_id": session_id} if session_id else {}
+    history, next_cursor = await fetch_page(db.form_help_history, limit, cursor, query)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return history
 
-@api_router.post("/chat", response_model=ChatResponse)
-async def chat_with_ai(request: ChatRequest):
-    """Chat with AI assistant about the form with full page context."""
-    try:
-        # Create a unique session ID based on page URL
-        session_id = f"chat-{uuid.uuid4()}"
-        
-        # Build context-aware system message
-        system_message = f"""You are an expert assistant helping users fill out the Indian Passport Seva application form and other government forms.
+@api_router.get("/form-help/cache/stats")
+async def get_form_help_cache_stats():
+    """Get hit/miss counters for the form help answer cache."""
+    return answer_cache.stats()
 
-You have access to the current webpage context including:
-- Page Title: {request.page_context.page_title}
-- Page URL: {request.page_context.page_url}
-- Visible form fields and their current values
-- All instructions, terms, and help text on the page
+@api_router.get("/analytics/rollups")
+async def get_analytics_rollups():
+    """Get the latest rollups: top fields per form, top questions per page, LLM latency."""
+    return await analytics_rollup.summary()
 
-Your role:
-1. Answer questions about the form fields, requirements, and process
-2. Explain what documents are needed
-3. Help users understand confusing terminology
-4. Guide them through the application process step-by-step
-5. Clarify eligibility criteria and requirements
-6. Explain consequences of different choices
+@api_router.get("/analytics/stats")
+async def get_analytics_stats():
+    """Get run counters for the rollup job and the last answer cache refresh this worker ran."""
+    return {**analytics_rollup.stats(), "cache_refresh": cache_refresh}
 
-Use the page context to give accurate, specific answers. Reference specific sections or fields from the page when relevant.
-Be concise, helpful, and friendly. If you don't see information on the page about their question, tell them clearly.
+@api_router.get("/history/stats")
+async def get_history_writer_stats():
+    """Get counters for the write-behind history logging pipeline."""
+    return history_writer.stats()
 
-Always prioritize accuracy and cite information from official sources when possible."""
+@api_router.get("/llm/stats")
+async def get_llm_stats():
+    """Get counters for outbound LLM calls, including coalesced duplicates and abandoned requests."""
+    return {
+        "client": llm_client.stats(),
+        "coalescing": llm_single_flight.stats(),
+        "deadlines": deadline_stats()
+    }
+
+def select_reference_passages(question: str) -> str:
+    """Retrieve the instruction passages most relevant to ``question`` within the token budget."""
+    with stage("retrieval"):
+        passages = doc_index.search(question, DOC_RETRIEVAL_TOP_K, DOC_RETRIEVAL_MIN_SCORE)
+    lines, used = [], 0
+    for passage in passages:
+        line = f"- [{passage['title']} > {passage['heading']}] {passage['text']}"
+        cost = estimate_tokens(line)
+        if used + cost > DOC_CONTEXT_TOKEN_BUDGET:
+            continue
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+def build_chat_prompt(request: ChatRequest, page: ChunkedPage, form_data: dict, session: ChatSession):
+    """Build the system message and user prompt for a chat request."""
+    # Build context-aware system message
+    system_message = CHAT_SYSTEM_MESSAGE_TEMPLATE.format(
+        page_title=request.page_context.page_title,
+        page_url=request.page_context.page_url
+    )
+
+    # Pack the most relevant page text, form values and history into the token budget
+    sections = build_context_sections(
+        question=request.message,
+        page=page,
+        form_data=form_data,
+        history=session.history(),
+        memory=session.memory,
+        budget=CHAT_CONTEXT_BUDGET
+    )
+    
+    context_parts = []
+    if sections["page"]:
+        context_parts.append(f"PAGE CONTENT:\n{sections['page']}")
+    if sections["form"]:
+        context_parts.append(f"CURRENT FORM VALUES:\n{sections['form']}")
+    
+    # Build user message with context and chat history
+    user_prompt_parts = []
+    
+    # Add conversation history
+    if sections["history"]:
+        user_prompt_parts.append("CONVERSATION HISTORY:")
+        user_prompt_parts.append(sections["history"])
+        user_prompt_parts.append("")
+    
+    # Add official instructions relevant to the question
+    reference = select_reference_passages(request.message)
+    if reference:
+        user_prompt_parts.append("OFFICIAL INSTRUCTIONS (retrieved):")
+        user_prompt_parts.append(reference)
+        user_prompt_parts.append("")
+    
+    # Add page context
+    if context_parts:
+        user_prompt_parts.append("WEBPAGE CONTEXT:")
+        user_prompt_parts.extend(context_parts)
+        user_prompt_parts.append("")
+    
+    # Add current user message
+    user_prompt_parts.append(f"USER QUESTION:\n{request.message}")
+    
+    return system_message, "\n".join(user_prompt_parts)
+
+def resolve_page_context(request: ChatRequest) -> ChunkedPage:
+    """Look up (or store) the chunked page text for a chat request.
+    
+    Raises a 409 when the client sent only a hash the server does not hold,
+    telling it to resend the full page_text.
+    """
+    try:
+        with stage("page_context"):
+            return page_context_store.resolve(
+                request.page_context.page_text,
+                request.page_context.page_text_hash
+            )
+    except PageContextMissing as e:
+        set_outcome("page_context_missing")
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "page_context_missing", "page_text_hash": e.page_text_hash}
+        )
+
+def resolve_form_data(request: ChatRequest) -> dict:
+    """Merge a form delta into the server-held form state for a chat request.
+    
+    Raises a 409 when the delta does not apply to the state this worker
+    holds, telling the client to resend the full form_data.
+    """
+    context = request.page_context
+    try:
+        return form_state_store.resolve(
+            context.form_sync_id,
+            context.form_data,
+            context.form_data_delta,
+            context.form_base_version,
+            context.form_version
+        )
+    except FormStateMissing as e:
+        set_outcome("form_state_missing")
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "form_state_missing", "form_sync_id": e.form_sync_id}
+        )
 
-        # Create chat instance
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
-        
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=session_id,
-            system_message=system_message
+def resolve_chat_session(request: ChatRequest) -> ChatSession:
+    """Look up the conversation for a chat request, starting one if needed.
+    
+    Raises a 409 when the client sent only a session id the server does not
+    hold, telling it to resend chat_history.
+    """
+    history = None
+    if request.chat_history:
+        history = [
+            ("User" if msg.role == "user" else "Assistant", msg.content)
+            for msg in request.chat_history
+        ]
+        # Clients include the message being asked as the last history entry
+        if history[-1] == ("User", request.message):
+            history.pop()
+    try:
+        return chat_sessions.resolve(request.session_id, history)
+    except SessionMissing as e:
+        set_outcome("session_missing")
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "session_missing", "session_id": e.session_id}
         )
-        chat.with_model("gemini", "gemini-2.5-flash")
-        
-        # Build context string
-        context_parts = []
-        if request.page_context.page_text:
-            # Truncate page text to first 8000 chars to avoid token limits
-            page_text_preview = request.page_context.page_text[:8000]
-            if len(request.page_context.page_text) > 8000:
-                page_text_preview += "... [truncated]"
-            context_parts.append(f"PAGE CONTENT:\n{page_text_preview}")
-        
-        if request.page_context.form_data:
-            form_fields = []
-            for field_name, field_value in request.page_context.form_data.items():
-                if field_value:
-                    form_fields.append(f"- {field_name}: {field_value}")
-            if form_fields:
-                context_parts.append(f"CURRENT FORM VALUES:\n" + "\n".join(form_fields))
-        
-        # Build user message with context and chat history
-        user_prompt_parts = []
-        
-        # Add conversation history
-        if request.chat_history and len(request.chat_history) > 0:
-            user_prompt_parts.append("CONVERSATION HISTORY:")
-            for msg in request.chat_history[-10:]:  # Last 10 messages
-                role_label = "User" if msg.role == "user" else "Assistant"
-                user_prompt_parts.append(f"{role_label}: {msg.content}")
-            user_prompt_parts.append("")
-        
-        # Add page context
-        if context_parts:
-            user_prompt_parts.append("WEBPAGE CONTEXT:")
-            user_prompt_parts.extend(context_parts)
-            user_prompt_parts.append("")
-        
-        # Add current user message
-        user_prompt_parts.append(f"USER QUESTION:\n{request.message}")
-        
-        full_prompt = "\n".join(user_prompt_parts)
-        
-        # Send to Gemini
-        user_message = UserMessage(text=full_prompt)
-        ai_response = await chat.send_message(user_message)
-        
-        # Store in database
-        chat_log = {
-            "id": str(uuid.uuid4()),
-            "session_id": session_id,
-            "page_url": request.page_context.page_url,
-            "user_message": request.message,
-            "ai_response": ai_response,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        await db.chat_history.insert_one(chat_log)
-        
-        return ChatResponse(
-            response=ai_response.strip(),
-            timestamp=datetime.now(timezone.utc)
+
+async def get_chat_reply(request: ChatRequest, session: ChatSession, page: ChunkedPage,
+                         form_data: dict) -> Tuple[str, float]:
+    """Send a chat request to Gemini and return the raw reply text and LLM latency in ms."""
+    session_id = session.session_id
+    with stage("prompt"):
+        system_message, full_prompt = build_chat_prompt(request, page, form_data, session)
+    
+    # Send to Gemini
+    started = time.perf_counter()
+    with stage("llm"):
+        check_llm_admission()
+        reply = await llm_single_flight.do(
+            prompt_key("chat", system_message, full_prompt),
+            lambda: call_llm(system_message, full_prompt, session_id)
         )
-        
+    set_outcome("llm")
+    return reply, round((time.perf_counter() - started) * 1000, 1)
+
+async def stream_chat_reply(request: ChatRequest, session: ChatSession, page: ChunkedPage,
+                            form_data: dict) -> AsyncIterator[str]:
+    """Yield a chat answer in pieces as the model produces them.
+    
+    Streamed calls are not coalesced: each reader needs its own stream, and
+    identical chat prompts are rare.
+    """
+    with stage("prompt"):
+        system_message, full_prompt = build_chat_prompt(request, page, form_data, session)
+    
+    pieces = llm_client.stream(system_message, full_prompt, session.session_id, deadline=current_deadline())
+    try:
+        with stage("llm_first_token"):
+            try:
+                first = await pieces.__anext__()
+            except StopAsyncIteration:
+                return
+        yield first
+        reply = [first]
+        async for piece in pieces:
+            reply.append(piece)
+            yield piece
+        observe_llm_call(system_message + full_prompt, "".join(reply))
+    finally:
+        await pieces.aclose()
+
+async def save_chat_log(session_id: str, request: ChatRequest, ai_response: str, llm_ms: float):
+    """Log a chat exchange to the history collection."""
+    chat_log = {
+        "id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "page_url": request.page_context.page_url,
+        "user_message": request.message,
+        "ai_response": ai_response,
+        "llm_ms": llm_ms,
+        "timestamp": datetime.now(timezone.utc)
+    }
+    with stage("history"):
+        await history_writer.put("chat_history", chat_log)
+
+@api_router.get("/form-help/knowledge-base")
+async def get_field_guidance_stats():
+    """Get the version and hit counters of the precomputed field guidance index."""
+    return field_guidance.stats()
+
+async def answer_chat(request: ChatRequest) -> ChatResponse:
+    """Answer one chat message and record it in the session and chat log."""
+    page = resolve_page_context(request)
+    form_data = resolve_form_data(request)
+    session = resolve_chat_session(request)
+    ai_response, llm_ms = await get_chat_reply(request, session, page, form_data)
+    session.append("User", request.message)
+    session.append("Assistant", ai_response.strip())
+    
+    # Store in database
+    await save_chat_log(session.session_id, request, ai_response, llm_ms)
+    
+    return ChatResponse(
+        response=ai_response.strip(),
+        session_id=session.session_id,
+        timestamp=datetime.now(timezone.utc)
+    )
+
+@api_router.post("/chat", response_model=ChatResponse)
+async def chat_with_ai(request: ChatRequest, http_request: Request):
+    """Chat with AI assistant about the form with full page context."""
+    deadline = resolve_deadline(http_request, CHAT_TIMEOUT_SECONDS, request.timeout_ms)
+    try:
+        return await run_request(http_request, answer_chat(request), deadline)
+    except DeadlineExceeded:
+        raise deadline_exceeded_response()
+    except ClientDisconnected:
+        raise client_disconnected_response()
+    except HTTPException:
+        raise
+    except LLMUnavailable as e:
+        raise llm_unavailable_response(e)
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
+        set_outcome("error")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/extension/download")
-async def download_extension():
-    """Download the Chrome extension as a zip file."""
-    extension_path = APP_DIR / "formwise-extension.zip"
-    if not extension_path.exists():
-        raise HTTPException(status_code=404, detail="Extension package not found")
-    return FileResponse(
-        path=str(extension_path),
-        filename="formwise-extension.zip",
-        media_type="application/zip"
+@api_router.post("/chat/stream")
+async def chat_with_ai_stream(request: ChatRequest, http_request: Request):
+    """Chat with AI assistant, streaming the answer as Server-Sent Events.
+    
+    Emits a ``start`` event immediately, a ``token`` event for each piece of
+    the answer as the model produces it, then a ``done`` event carrying the
+    full ChatResponse. The chat log is
+    written only after the stream completes; a client disconnect cancels
+    the stream, the LLM call and the log write.
+    """
+    deadline = resolve_deadline(http_request, CHAT_TIMEOUT_SECONDS, request.timeout_ms)
+    page = resolve_page_context(request)
+    form_data = resolve_form_data(request)
+    session = resolve_chat_session(request)
+    
+    async def event_stream():
+        set_deadline(deadline)
+        yield sse_event("start", {"session_id": session.session_id})
+        pieces = stream_chat_reply(request, session, page, form_data)
+        parts = []
+        try:
+            started = time.perf_counter()
+            with stage("llm"):
+                while True:
+                    try:
+                        piece = await within_deadline(pieces.__anext__(), deadline)
+                    except StopAsyncIteration:
+                        break
+                    parts.append(piece)
+                    yield sse_event("token", {"text": piece})
+            llm_ms = round((time.perf_counter() - started) * 1000, 1)
+            set_outcome("llm")
+            ai_response = "".join(parts)
+            answer = ai_response.strip()
+            session.append("User", request.message)
+            session.append("Assistant", answer)
+            
+            await save_chat_log(session.session_id, request, ai_response, llm_ms)
+            
+            result = ChatResponse(
+                response=answer,
+                session_id=session.session_id,
+                timestamp=datetime.now(timezone.utc)
+            )
+            yield sse_event("done", json.loads(result.model_dump_json()))
+        except DeadlineExceeded:
+            set_outcome("timeout")
+            yield sse_event("error", {"code": "deadline_exceeded", "detail": "The answer was not ready before the request deadline", "status": 504})
+        except asyncio.CancelledError:
+            record_disconnect()
+            raise
+        except LLMUnavailable as e:
+            logger.warning(f"Chat stream rejected: {e}")
+            set_outcome("rejected")
+            yield sse_event("error", {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {e}")
+            set_outcome("error")
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            await pieces.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+@api_router.get("/worker/stats")
+async def get_worker_stats():
+    """Get startup time, memory and event loop of the worker serving this request."""
+    return {
+        **worker_startup,
+        "import_seconds": IMPORT_SECONDS,
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "event_loop": event_loop_name()
+    }
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: request and stage latency, LLM prompt/reply sizes."""
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/chat/knowledge-base")
+async def get_doc_index_stats():
+    """Get the version and query counters of the form instruction retrieval index."""
+    return doc_index.stats()
+
+@api_router.get("/chat/sessions/stats")
+async def get_chat_session_stats():
+    """Get counters for the server-side chat session store."""
+    return chat_sessions.stats()
+
+@api_router.get("/page-context/stats")
+async def get_page_context_stats():
+    """Get hit/miss counters for the server-side page context and form state stores."""
+    return {**page_context_store.stats(), "form_state": form_state_store.stats()}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def serve_extension_package(request: Request, cache_control: str) -> Response:
+    """Send the extension archive, honouring If-None-Match and Range."""
+    package = extension_package
+    headers = {
+        "ETag": package.etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="formwise-extension-{package.version}.zip"',
+        "X-Extension-Version": package.version
+    }
+    if etag_matches(request.headers.get("if-none-match"), package.etag):
+        package.not_modified += 1
+        return Response(status_code=304, headers={k: headers[k] for k in ("ETag", "Cache-Control")})
+    
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range.strip() == package.etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), package.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{package.size}", "ETag": package.etag})
+    
+    if byte_range is None:
+        package.full_responses += 1
+        body = package.content
+        status_code = 200
+    else:
+        package.partial_responses += 1
+        start, end = byte_range
+        body = package.content[start:end + 1]
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{package.size}"
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        body = b""
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/zip")
+
+def current_extension_package():
+    extension_package.refresh()
+    if not extension_package.available:
+        raise HTTPException(status_code=404, detail="Extension package not found")
+    return extension_package
+
+@api_router.api_route("/extension/download", methods=["GET", "HEAD"])
+async def download_extension(request: Request):
+    """Download the Chrome extension as a zip file.
+    
+    This URL always names the latest build, so clients must revalidate; the
+    ETag turns a repeat download into a 304.
+    """
+    current_extension_package()
+    return serve_extension_package(request, "public, no-cache")
+
+@api_router.api_route("/extension/download/{tag}", methods=["GET", "HEAD"])
+async def download_extension_version(tag: str, request: Request):
+    """Download one exact build by its version tag; the response never changes."""
+    package = current_extension_package()
+    if tag != package.tag:
+        # Older builds are not kept; point the client at the current one
+        return RedirectResponse(f"{request.url.path.rsplit('/', 1)[0]}/{package.tag}", status_code=302)
+    return serve_extension_package(request, IMMUTABLE_CACHE_CONTROL)
+
+@api_router.get("/extension/latest")
+async def check_extension_update(request: Request, response: Response, version: Optional[str] = None):
+    """Tell an installed extension whether ``version`` is the current release."""
+    package = current_extension_package()
+    package.update_checks += 1
+    headers = {"ETag": package.etag, "Cache-Control": f"public, max-age={EXTENSION_UPDATE_CHECK_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), package.etag):
+        package.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {
+        **package.describe(),
+        "download_url": f"{request.url.path.rsplit('/', 1)[0]}/download/{package.tag}",
+        "update_available": None if version is None else version != package.version
+    }
+
+@api_router.get("/extension/stats")
+async def get_extension_package_stats():
+    """Get the current extension build and its full/partial/304 download counters."""
+    return extension_package.stats()
+
+IMPORT_SECONDS = round(time.monotonic() - IMPORT_STARTED, 3)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(
+    MetricsMiddleware,
+    paths=["/api/form-help", "/api/form-help/batch", "/api/chat", "/api/chat/stream"],
+    server_timing=SERVER_TIMING_HEADER
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -377,6 +1087,172 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def init_llm_client():
+    worker_startup["started"] = time.monotonic()
+    llm_client.start()
+
+@app.on_event("startup")
+async def init_mongo_pool():
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        logger.warning(f"MongoDB ping failed during startup: {e}")
+
+@app.on_event("startup")
+async def init_indexes():
+    try:
+        await db.status_checks.create_index([("timestamp", -1), ("id", -1)])
+        await db.form_help_history.create_index([("timestamp", -1), ("id", -1)])
+        await db.form_help_history.create_index("session_id")
+        await db.chat_history.create_index([("timestamp", -1), ("id", -1)])
+        await db.chat_history.create_index("session_id")
+        await db.chat_history.create_index("page_url")
+    except Exception as e:
+        logger.warning(f"Could not create collection indexes: {e}")
+    await migrate_string_timestamps()
+
+STRING_TIMESTAMP_MIGRATION = "string_timestamps"
+# A worker that died mid-migration gives up its claim after this long
+MIGRATION_CLAIM_SECONDS = 3600
+
+async def migrate_string_timestamps():
+    """Convert legacy ISO string timestamps to native BSON dates, once per deployment.
+
+    One worker claims the migration through a marker document in
+    ``migrations``; the others skip it. The marker is marked done only if
+    every collection converted, so a failure is retried on a later startup.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await db.migrations.update_one(
+            {
+                "_id": STRING_TIMESTAMP_MIGRATION,
+                "done": {"$ne": True},
+                "$or": [
+                    {"started_at": None},
+                    {"started_at": {"$lt": now - timedelta(seconds=MIGRATION_CLAIM_SECONDS)}},
+                ],
+            },
+            {"$set": {"started_at": now, "owner": f"{socket.gethostname()}:{os.getpid()}"}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Already done, or another worker is running it
+        return
+    except Exception as e:
+        logger.warning(f"Could not claim the timestamp migration: {e}")
+        return
+
+    converted, failed = {}, []
+    for collection in (db.status_checks, db.form_help_history, db.chat_history):
+        try:
+            result = await collection.update_many(
+                {"timestamp": {"$type": "string"}},
+                # Unparseable values are left as strings rather than failing the batch
+                [{"$set": {"timestamp": {
+                    "$convert": {"input": "$timestamp", "to": "date", "onError": "$timestamp"}
+                }}}]
+            )
+        except Exception as e:
+            logger.warning(f"Could not convert string timestamps in {collection.name}: {e}")
+            failed.append(collection.name)
+            continue
+        converted[collection.name] = result.modified_count
+        if result.modified_count:
+            logger.info(f"Converted {result.modified_count} string timestamps in {collection.name}")
+
+    update = {"$set": {"done": True, "finished_at": datetime.now(timezone.utc), "converted": converted}}
+    if failed:
+        update = {"$set": {"started_at": None, "failed": failed, "converted": converted}}
+    try:
+        await db.migrations.update_one({"_id": STRING_TIMESTAMP_MIGRATION}, update)
+    except Exception as e:
+        logger.warning(f"Could not record the timestamp migration: {e}")
+
+@app.on_event("startup")
+async def init_history_writer():
+    history_writer.start()
+
+@app.on_event("startup")
+async def init_answer_cache():
+    try:
+        await answer_cache.ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Could not create answer cache indexes: {e}")
+
+cache_refresh = {}
+
+async def refresh_answer_cache():
+    """Re-answer the most requested fields whose cached answer is missing or about to expire.
+
+    Runs on the worker that computed the rollups, right after it did, so
+    each answer is regenerated once rather than by every worker. Fresh
+    answers get a new TTL; entries that are not refreshed expire as usual.
+    """
+    started = time.monotonic()
+    counts = {"fresh": 0, "refreshed": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(CACHE_REFRESH_CONCURRENCY)
+    
+    async def refresh(field: dict):
+        expires_in = await answer_cache.expires_in(field["cache_key"])
+        if expires_in is not None and expires_in > CACHE_REFRESH_WITHIN_SECONDS:
+            counts["fresh"] += 1
+            return
+        request = FormHelpRequest(
+            field_label=field["field_label"],
+            field_type=field.get("field_type"),
+            field_options=field.get("field_options"),
+            form_context=field["form_context"]
+        )
+        async with semaphore:
+            try:
+                result, complete, _ = await generate_form_help(request, f"cache-refresh-{uuid.uuid4()}")
+            except Exception as e:
+                logger.warning(f"Could not refresh the cached answer for '{request.field_label}': {e!r}")
+                result, complete = None, False
+        if result is None or not complete:
+            counts["failed"] += 1
+            return
+        await answer_cache.set(field["cache_key"], result.model_dump())
+        counts["refreshed"] += 1
+    
+    # Knowledge-base answers are not cached, and entries logged before
+    # cache keys were recorded cannot be matched to their cache entry
+    fields = [
+        field for field in await analytics_rollup.top_fields(CACHE_REFRESH_LIMIT)
+        if field.get("source") in ("llm", "cache") and field.get("cache_key")
+    ]
+    try:
+        await asyncio.wait_for(asyncio.gather(*(refresh(field) for field in fields)), CACHE_REFRESH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"Answer cache refresh stopped after {CACHE_REFRESH_TIMEOUT_SECONDS}s")
+    cache_refresh.update(counts, seconds=round(time.monotonic() - started, 3), at=datetime.now(timezone.utc))
+    logger.info(f"Refreshed answer cache: {counts}")
+
+@app.on_event("startup")
+async def init_analytics():
+    try:
+        await analytics_rollup.ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Could not create analytics indexes: {e}")
+    analytics_rollup.start(ANALYTICS_ROLLUP_INTERVAL_SECONDS, refresh_answer_cache)
+
+@app.on_event("startup")
+async def report_worker_startup():
+    worker_startup.update(
+        pid=os.getpid(),
+        startup_seconds=round(time.monotonic() - worker_startup.pop("started"), 3),
+        rss_bytes_after_startup=rss_bytes()
+    )
+    logger.info(
+        f"Worker {os.getpid()} started in {worker_startup['startup_seconds']}s on {event_loop_name()} "
+        f"(rss {worker_startup['rss_bytes_after_startup'] / 2**20:.1f} MiB)"
+    )
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await analytics_rollup.close()
+    await history_writer.close()
+    await llm_client.close()
     client.close()
@@ -0,0 +1,114 @@
+"""Server-side chat sessions.
+
+Each chat conversation gets a stable session id. The server keeps the
+newest turns verbatim and folds older ones into a compact rolling memory of
+one-line summaries, so the client sends only the new message and the prompt
+stays a fixed size however long the conversation runs. Sessions live in a
+bounded LRU and expire after a period of inactivity.
+"""
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import List, Optional, Sequence, Tuple
+
+from context_builder import estimate_tokens, summarize_turn
+
+
+class SessionMissing(Exception):
+    """Raised when a request names a session the store no longer holds."""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Chat session {session_id} is not cached; resend chat_history")
+        self.session_id = session_id
+
+
+class ChatSession:
+    """Recent turns plus a rolling memory of summarized older turns."""
+
+    def __init__(self, session_id: str, max_turns: int, memory_tokens: int):
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.memory_tokens = memory_tokens
+        self.turns: deque = deque()
+        self.memory: deque = deque()
+        self.turn_count = 0
+
+    def append(self, role: str, content: str):
+        """Add a turn, folding the oldest verbatim turn into memory when full."""
+        self.turns.append((role, content))
+        self.turn_count += 1
+        while len(self.turns) > self.max_turns:
+            old_role, old_content = self.turns.popleft()
+            self.memory.append(f"{old_role}: {summarize_turn(old_content)}")
+        while self.memory and sum(estimate_tokens(line) for line in self.memory) > self.memory_tokens:
+            self.memory.popleft()
+
+    def history(self) -> List[Tuple[str, str]]:
+        return list(self.turns)
+
+
+class SessionStore:
+    """Bounded LRU of chat sessions with an inactivity TTL."""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: int = 3600,
+                 max_turns: int = 6, memory_tokens: int = 200):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.memory_tokens = memory_tokens
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self.created = 0
+        self.resumed = 0
+        self.reseeded = 0
+        self.expired = 0
+
+    def _touch(self, session: ChatSession):
+        self._sessions[session.session_id] = (time.monotonic() + self.ttl_seconds, session)
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def _get(self, session_id: str) -> Optional[ChatSession]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._sessions[session_id]
+            self.expired += 1
+            return None
+        return entry[1]
+
+    def resolve(self, session_id: Optional[str], history: Optional[Sequence[Tuple[str, str]]]) -> ChatSession:
+        """Return the session for a request, creating or re-seeding it as needed.
+
+        ``history`` is the client's copy of the conversation, oldest first, or
+        None if it sent none. It is only used when the server has no session;
+        if it was not sent either, ``SessionMissing`` tells the client to
+        resend it.
+        """
+        session = self._get(session_id) if session_id else None
+        if session is not None:
+            self.resumed += 1
+        elif session_id and history is None:
+            raise SessionMissing(session_id)
+        else:
+            session = ChatSession(session_id or f"chat-{uuid.uuid4()}", self.max_turns, self.memory_tokens)
+            for role, content in history or ():
+                session.append(role, content)
+            if session_id:
+                self.reseeded += 1
+            else:
+                self.created += 1
+        self._touch(session)
+        return session
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "created": self.created,
+            "resumed": self.resumed,
+            "reseeded": self.reseeded,
+            "expired": self.expired,
+            "max_turns": self.max_turns,
+            "memory_tokens": self.memory_tokens,
+        }
@@ -0,0 +1,70 @@
+"""Request coalescing (single-flight) for LLM calls.
+
+Concurrent callers asking for the same key share one in-flight task instead
+of each starting their own provider round-trip.
+"""
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+
+def prompt_key(*parts: str) -> str:
+    """Hash prompt text into a compact single-flight key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key onto one asyncio task."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` for ``key`` unless an identical call is already in flight.
+
+        The shared task is only cancelled once every caller waiting on it has
+        been cancelled, so one client going away does not fail the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters.get(key) == 1:
+                task.cancel()
+                # Callers arriving while it unwinds must start a fresh call
+                self._forget(key, task)
+            raise
+        finally:
+            if key in self._waiters and self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+
+    def stats(self) -> dict:
+        total = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / total, 4) if total else 0.0,
+        }
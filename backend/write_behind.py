@@ -0,0 +1,115 @@
+"""Write-behind pipeline for history logging.
+
+Request handlers enqueue history documents and return immediately; a
+background worker drains the queue and writes them with ``insert_many`` in
+batches, flushing whenever a batch fills up or the flush interval elapses.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class WriteBehindQueue:
+    """Bounded asyncio queue of (collection, document) pairs flushed in batches."""
+
+    def __init__(self, db, max_batch: int = 100, flush_interval: float = 0.5,
+                 max_buffer: int = 10000, overflow_policy: str = "drop_oldest"):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self._worker: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def put(self, collection: str, doc: dict):
+        """Queue ``doc`` for insertion into ``collection``.
+
+        Only the ``block`` overflow policy ever waits; the drop policies
+        return immediately and count what they discard.
+        """
+        if self._worker is None:
+            # No worker running (e.g. during startup or tests): write inline.
+            await self.db[collection].insert_one(doc)
+            self.written += 1
+            return
+
+        if self.overflow_policy == "block":
+            await self._queue.put((collection, doc))
+            return
+
+        if self._queue.full():
+            self.dropped += 1
+            if self.overflow_policy == "drop_newest":
+                return
+            self._queue.get_nowait()
+            self._queue.task_done()
+        self._queue.put_nowait((collection, doc))
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            loop = asyncio.get_running_loop()
+            flush_at = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = flush_at - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch):
+        by_collection = defaultdict(list)
+        for collection, doc in batch:
+            by_collection[collection].append(doc)
+        for collection, docs in by_collection.items():
+            try:
+                await self.db[collection].insert_many(docs, ordered=False)
+                self.written += len(docs)
+            except Exception as e:
+                self.failed += len(docs)
+                logger.error(f"Failed to write {len(docs)} documents to {collection}: {e}")
+        self.batches += 1
+
+    async def close(self):
+        """Flush everything still buffered and stop the worker."""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "overflow_policy": self.overflow_policy,
+        }
@@ -0,0 +1,255 @@
+"""Offline load test and latency benchmark for the FormWise backend.
+
+Runs backend/server.py in-process against an in-memory MongoDB stand-in
+(mongomock-motor) and a mock LLM provider with configurable latency and
+failure distributions, then drives /api/form-help, /api/chat and the history
+endpoints at each requested concurrency level and reports RPS,
+p50/p95/p99 latency, error counts and event-loop lag.
+
+Usage:
+    pip install mongomock-motor
+    python backend_benchmark.py --concurrency 1,8,32 --requests 200
+    python backend_benchmark.py --llm-latency-ms 1500 --llm-failure-rate 0.02 --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+
+KNOWN_LABELS = [
+    "Is either of your parent a government servant?",
+    "Is applicant eligible for Non-ECR category?",
+    "Employment Type",
+    "Given Name (First & Middle Name)",
+    "Date of Birth (DD-MM-YYYY)",
+]
+
+PAGE_TEXT = (
+    "Passport Seva - Application Form. Fill all mandatory fields marked with an asterisk. "
+    "The fee for a fresh 36 page passport is Rs 1500 and Rs 2000 for 60 pages. "
+    "Tatkaal applications require an additional fee of Rs 2000. "
+    "Applicants who have passed Class 10 are eligible for Non-ECR category. "
+    "Proof of address may be Aadhaar, electricity bill or bank passbook. "
+) * 40
+
+MOCK_FORM_HELP_REPLY = json.dumps({
+    "needs_interaction": True,
+    "clarification_question": "Which of these applies to you?",
+    "question_options": [
+        {"label": "Yes", "value": "yes", "recommendation": "Select 'Yes'"},
+        {"label": "No", "value": "no", "recommendation": "Select 'No'"},
+    ],
+    "advice": "Mock advice for benchmarking.",
+    "warning": "Mock warning for benchmarking.",
+})
+
+
+class MockProviderError(Exception):
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MockLLM:
+    """Stand-in for the provider: log-normal latency plus random failures."""
+
+    def __init__(self, median_ms, sigma, failure_rate, rate_limit_rate, form_help_system_message):
+        self.median_s = median_ms / 1000
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.form_help_system_message = form_help_system_message
+        self.calls = 0
+
+    def new_chat(self, system_message, session_id=None, route=None):
+        return MockChat(self, system_message)
+
+
+class MockChat:
+    def __init__(self, llm, system_message):
+        self.llm = llm
+        self.system_message = system_message
+
+    async def send_message(self, user_message):
+        llm = self.llm
+        llm.calls += 1
+        await asyncio.sleep(random.lognormvariate(0, llm.sigma) * llm.median_s)
+        roll = random.random()
+        if roll < llm.rate_limit_rate:
+            raise MockProviderError("429 Resource exhausted", status_code=429)
+        if roll < llm.rate_limit_rate + llm.failure_rate:
+            raise MockProviderError("Mock provider failure")
+        if self.system_message == llm.form_help_system_message:
+            return MOCK_FORM_HELP_REPLY
+        return "Mock chat answer. " * 20
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires, i.e. event-loop blocking."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def make_request(scenario, unique_ratio, counter):
+    """Return (method, path, json_body) for one request of ``scenario``."""
+    unique = random.random() < unique_ratio
+    if scenario == "form-help":
+        label = f"Benchmark field {counter}" if unique else random.choice(KNOWN_LABELS + ["Place of Birth"])
+        return "POST", "/api/form-help", {"field_label": label, "field_type": "input", "form_context": "Passport Seva"}
+    if scenario == "chat":
+        question = f"Question {counter}: what is the tatkaal fee?" if unique else "What is the tatkaal fee?"
+        return "POST", "/api/chat", {
+            "message": question,
+            "page_context": {"page_title": "Passport Seva", "page_url": "https://example.test", "page_text": PAGE_TEXT},
+            "chat_history": [],
+        }
+    if scenario == "history":
+        return "GET", random.choice(["/api/form-help/history?limit=20", "/api/status?limit=50"]), None
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+async def run_level(http, scenario, concurrency, total, unique_ratio):
+    latencies, statuses = [], {}
+    counter = iter(range(total))
+    monitor = LoopLagMonitor()
+
+    async def worker():
+        for i in counter:
+            method, path, body = make_request(scenario, unique_ratio, i)
+            started = time.perf_counter()
+            response = await http.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "loop_lag_p99_ms": round(percentile(monitor.samples, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(monitor.samples, default=0.0) * 1000, 2),
+        "statuses": statuses,
+    }
+
+
+def load_app(args):
+    """Import the FastAPI app wired to in-memory Mongo and the mock LLM."""
+    os.environ.setdefault("MONGO_URL", "mongodb://benchmark")
+    os.environ.setdefault("DB_NAME", "formwise_benchmark")
+    os.environ.setdefault("EMERGENT_LLM_KEY", "benchmark")
+
+    if not args.mongo_url:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("mongomock-motor is required for the in-memory Mongo stand-in: pip install mongomock-motor "
+                     "(or pass --mongo-url to use a real MongoDB)")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    else:
+        os.environ["MONGO_URL"] = args.mongo_url
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    mock = MockLLM(args.llm_latency_ms, args.llm_latency_sigma, args.llm_failure_rate,
+                   args.llm_rate_limit_rate, server.FORM_HELP_SYSTEM_MESSAGE)
+    server.llm_client.new_chat = mock.new_chat
+    return server, mock
+
+
+async def main_async(args):
+    import httpx
+
+    server, mock = load_app(args)
+    results = []
+    await server.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as http:
+            for scenario in args.scenarios.split(","):
+                for concurrency in (int(c) for c in args.concurrency.split(",")):
+                    result = await run_level(http, scenario, concurrency, args.requests, args.unique_ratio)
+                    results.append(result)
+                    print(f"{result['scenario']:>10} c={result['concurrency']:<4} "
+                          f"rps={result['rps']:<8} p50={result['p50_ms']:<8} p95={result['p95_ms']:<8} "
+                          f"p99={result['p99_ms']:<8} lag_p99={result['loop_lag_p99_ms']:<6} "
+                          f"statuses={result['statuses']}")
+    finally:
+        await server.app.router.shutdown()
+
+    print(f"Mock LLM calls: {mock.calls}")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "results": results}, indent=2))
+        print(f"Wrote {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="form-help,chat,history",
+                        help="comma-separated scenarios: form-help, chat, history")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--unique-ratio", type=float, default=0.5,
+                        help="share of requests with a unique prompt (cache/coalescing misses)")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="median mock LLM latency")
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.5, help="log-normal sigma of mock LLM latency")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="share of mock LLM calls that fail")
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0, help="share of mock LLM calls that 429")
+    parser.add_argument("--mongo-url", help="use a real MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
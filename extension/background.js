@@ -2,24 +2,110 @@
 
 const API_BASE_URL = 'https://formaid.preview.emergentagent.com/api';
 
+// Hashes of page texts the backend already holds, so follow-up chat
+// messages can send the hash instead of re-uploading the text
+const MAX_UPLOADED_CONTEXTS = 50;
+const uploadedContextHashes = new Set();
+
+// Requests are aborted after these budgets; the backend gets the same
+// deadline and stops working on the answer when it passes
+const REQUEST_TIMEOUTS_MS = {
+  formHelp: 30000,
+  formHelpBatch: 120000,
+  chat: 60000
+};
+
+// In-flight form help request per tab, aborted when superseded or abandoned
+const formHelpRequests = new Map();
+
 chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
   if (request.type === 'GET_FORM_HELP') {
-    fetchFormHelp(request.payload)
+    const tabId = sender.tab ? sender.tab.id : null;
+    const controller = new AbortController();
+    abortFormHelp(tabId);
+    formHelpRequests.set(tabId, controller);
+    fetchFormHelp(request.payload, controller.signal)
       .then(response => sendResponse({ success: true, data: response }))
-      .catch(error => sendResponse({ success: false, error: error.message }));
+      .catch(error => sendResponse(controller.signal.aborted && error.name === 'AbortError'
+        ? { success: false, cancelled: true }
+        : { success: false, error: error.message }))
+      .finally(() => {
+        if (formHelpRequests.get(tabId) === controller) formHelpRequests.delete(tabId);
+      });
     return true;
   }
+
+  if (request.type === 'CANCEL_FORM_HELP') {
+    abortFormHelp(sender.tab ? sender.tab.id : null);
+  }
   
-  if (request.type === 'SEND_CHAT_MESSAGE') {
-    sendChatMessage(request.payload)
-      .then(response => sendResponse({ success: true, data: response }))
-      .catch(error => sendResponse({ success: false, error: error.message }));
-    return true;
+});
+
+// Chat answers are streamed over a long-lived port so tokens can be
+// forwarded to the content script as soon as they arrive
+chrome.runtime.onConnect.addListener((port) => {
+  // The content script disconnects the port when the page goes away
+  const controller = new AbortController();
+  port.onDisconnect.addListener(() => controller.abort());
+
+  if (port.name === 'chat-stream') {
+    port.onMessage.addListener((request) => {
+      if (request.type === 'SEND_CHAT_MESSAGE') {
+        streamChatMessage(request.payload, port, controller.signal)
+          .catch(error => reportStreamError(port, error));
+      }
+    });
+  }
+
+  // Field guidance for a whole page is pre-fetched on load and streamed back per field
+  if (port.name === 'form-help-batch') {
+    port.onMessage.addListener((request) => {
+      if (request.type === 'PREFETCH_FORM_HELP') {
+        prefetchFormHelp(request.payload, port, controller.signal)
+          .catch(error => reportStreamError(port, error));
+      }
+    });
   }
 });
 
-async function fetchFormHelp(payload) {
-  const response = await fetch(`${API_BASE_URL}/form-help`, {
+// Tabs that navigate or close abandon their pending form help request
+chrome.tabs.onRemoved.addListener((tabId) => abortFormHelp(tabId));
+chrome.tabs.onUpdated.addListener((tabId, changeInfo) => {
+  if (changeInfo.status === 'loading') abortFormHelp(tabId);
+});
+
+function abortFormHelp(tabId) {
+  const controller = formHelpRequests.get(tabId);
+  if (controller) {
+    formHelpRequests.delete(tabId);
+    controller.abort();
+  }
+}
+
+function reportStreamError(port, error) {
+  // An aborted request has nobody left to tell
+  if (error.name === 'AbortError') return;
+  if (error.name === 'TimeoutError') {
+    safePostMessage(port, { type: 'error', data: { detail: 'The request timed out, please try again' } });
+    return;
+  }
+  safePostMessage(port, { type: 'error', data: { detail: error.message } });
+}
+
+// fetch() that gives up after timeoutMs or when signal aborts, telling the
+// backend the same budget so it can stop early too
+function fetchWithDeadline(path, options, timeoutMs, signal) {
+  const signals = [AbortSignal.timeout(timeoutMs)];
+  if (signal) signals.push(signal);
+  return fetch(`${API_BASE_URL}${path}`, {
+    ...options,
+    headers: { ...options.headers, 'X-Request-Timeout-Ms': String(timeoutMs) },
+    signal: AbortSignal.any(signals)
+  });
+}
+
+async function fetchFormHelp(payload, signal) {
+  const response = await fetchWithDeadline('/form-help', {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
@@ -30,7 +116,7 @@ async function fetchFormHelp(payload) {
       field_options: payload.fieldOptions || '',
       form_context: payload.formContext || 'Indian Passport Application Form'
     })
-  });
+  }, REQUEST_TIMEOUTS_MS.formHelp, signal);
 
   if (!response.ok) {
     throw new Error(`API request failed: ${response.status}`);
@@ -39,26 +125,182 @@ async function fetchFormHelp(payload) {
   return response.json();
 }
 
-async function sendChatMessage(payload) {
-  const response = await fetch(`${API_BASE_URL}/chat`, {
+async function streamChatMessage(payload, port, signal) {
+  const pageContext = { ...payload.pageContext };
+  pageContext.page_text_hash = await hashText(pageContext.page_text || '');
+  const hash = pageContext.page_text_hash;
+  const sync = payload.formSync;
+
+  // Send only the hash, the changed form fields and the new message when the
+  // backend should already hold the rest; a 409 says which part to upload in full
+  let sendText = !uploadedContextHashes.has(hash);
+  let sendFullForm = !sync || sync.baseVersion === 0;
+  let sendHistory = !payload.sessionId;
+
+  while (true) {
+    const context = {
+      ...pageContext,
+      page_text: sendText ? pageContext.page_text : '',
+      ...buildFormState(sync, sendFullForm)
+    };
+    try {
+      await streamSSE('/chat/stream', {
+        message: payload.message,
+        page_context: context,
+        session_id: payload.sessionId || null,
+        chat_history: sendHistory ? (payload.chatHistory || []) : []
+      }, port, REQUEST_TIMEOUTS_MS.chat, signal);
+      rememberUploadedContext(hash);
+      return;
+    } catch (error) {
+      const code = error.status === 409 && error.detail ? error.detail.code : null;
+      if (code === 'page_context_missing' && !sendText) {
+        uploadedContextHashes.delete(hash);
+        sendText = true;
+      } else if (code === 'form_state_missing' && !sendFullForm) {
+        sendFullForm = true;
+      } else if (code === 'session_missing' && !sendHistory) {
+        sendHistory = true;
+      } else {
+        throw error;
+      }
+    }
+  }
+}
+
+function buildFormState(sync, full) {
+  if (!sync) return {};
+  if (full) {
+    return { form_data: sync.fields, form_sync_id: sync.syncId, form_version: sync.version };
+  }
+  return {
+    form_data: {},
+    form_data_delta: sync.delta,
+    form_sync_id: sync.syncId,
+    form_base_version: sync.baseVersion,
+    form_version: sync.version
+  };
+}
+
+function rememberUploadedContext(hash) {
+  uploadedContextHashes.add(hash);
+  if (uploadedContextHashes.size > MAX_UPLOADED_CONTEXTS) {
+    uploadedContextHashes.delete(uploadedContextHashes.values().next().value);
+  }
+}
+
+// SHA-256 hex digest, matching the backend's page context hash
+async function hashText(text) {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest))
+    .map(b => b.toString(16).padStart(2, '0'))
+    .join('');
+}
+
+async function prefetchFormHelp(payload, port, signal) {
+  await streamSSE('/form-help/batch', {
+    fields: payload.fields.map(field => ({
+      field_label: field.fieldLabel,
+      field_type: field.fieldType,
+      field_options: field.fieldOptions || '',
+      form_context: payload.formContext || 'Indian Passport Application Form'
+    }))
+  }, port, REQUEST_TIMEOUTS_MS.formHelpBatch, signal);
+}
+
+// POST a JSON body and forward each Server-Sent Event to the port
+async function streamSSE(path, body, port, timeoutMs, signal) {
+  const response = await fetchWithDeadline(path, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
     },
-    body: JSON.stringify({
-      message: payload.message,
-      page_context: payload.pageContext,
-      chat_history: payload.chatHistory || []
-    })
-  });
+    body: JSON.stringify(body)
+  }, timeoutMs, signal);
 
   if (!response.ok) {
-    throw new Error(`API request failed: ${response.status}`);
+    const error = new Error(`API request failed: ${response.status}`);
+    error.status = response.status;
+    try {
+      error.detail = (await response.json()).detail;
+    } catch (e) {
+      // Not a JSON error body
+    }
+    throw error;
   }
 
-  return response.json();
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const event = parseSSEEvent(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      if (event) safePostMessage(port, event);
+    }
+  }
+}
+
+// Parse one "event: ...\ndata: ..." block into { type, data }
+function parseSSEEvent(rawEvent) {
+  let type = 'message';
+  const dataLines = [];
+  rawEvent.split('\n').forEach(line => {
+    if (line.startsWith('event:')) type = line.slice(6).trim();
+    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+  });
+  if (dataLines.length === 0) return null;
+
+  try {
+    return { type, data: JSON.parse(dataLines.join('\n')) };
+  } catch (error) {
+    console.error('Invalid SSE payload:', error);
+    return null;
+  }
+}
+
+function safePostMessage(port, message) {
+  try {
+    port.postMessage(message);
+  } catch (error) {
+    // Port was closed by the content script (e.g. page navigated away)
+  }
 }
 
 chrome.runtime.onInstalled.addListener((details) => {
   console.log('Government Form Helper installed:', details.reason);
+  checkForUpdate();
 });
+
+chrome.runtime.onStartup.addListener(checkForUpdate);
+
+// Ask the backend whether a newer package exists; only a small JSON reply
+// is fetched, never the archive itself
+async function checkForUpdate() {
+  const version = chrome.runtime.getManifest().version;
+  try {
+    const response = await fetch(`${API_BASE_URL}/extension/latest?version=${encodeURIComponent(version)}`);
+    if (!response.ok) return;
+    const latest = await response.json();
+    await chrome.storage.local.set({
+      extensionUpdate: {
+        available: latest.update_available === true,
+        version: latest.version,
+        downloadUrl: `${API_BASE_URL}/extension/download/${latest.tag}`,
+        checkedAt: Date.now()
+      }
+    });
+    if (latest.update_available) {
+      console.log(`FormWise ${latest.version} is available (installed ${version})`);
+    }
+  } catch (error) {
+    console.warn('Extension update check failed:', error.message);
+  }
+}
@@ -6,6 +6,9 @@
 
   const CONFIG = {
     debounceDelay: 400,
+    prefetchMaxFields: 50, // The backend rejects batches over FORM_HELP_BATCH_MAX_FIELDS (default 50)
+    pageTextMaxChars: 100000, // Sent once per page, then only its hash; the backend allows up to 200000
+    pageTextRefreshDelay: 1000, // Debounce before re-reading page text after DOM changes
     formContext: 'Indian Passport Application Form (Passport Seva Portal)'
   };
 
@@ -19,9 +22,11 @@
     error: null,
     detectedOptions: null,
     detectedQuestion: null,
+    prefetchedHelp: {}, // Field guidance warmed on page load, keyed by getHelpKey()
     // Chat state
     activeTab: 'field-help', // 'field-help' or 'chat'
     chatMessages: [],
+    chatSessionId: null, // Server-side conversation; later messages send only the new question
     chatInput: '',
     isChatLoading: false,
     chatError: null
@@ -30,6 +35,17 @@
   let helperPanel = null;
   let debounceTimer = null;
 
+  // Page context kept up to date incrementally instead of re-scanned per chat message
+  const formSync = {
+    syncId: crypto.randomUUID(),
+    syncedVersion: 0, // Last form state version the backend acknowledged (0 = none)
+    fields: {}, // Field name -> current non-empty value
+    dirty: new Set() // Field names changed since the acknowledged version
+  };
+  let pageTextCache = '';
+  let pageTextDirty = true;
+  let pageTextTimer = null;
+
   function init() {
     console.log('Form Helper: Initializing real-time DOM detection...');
     if (document.readyState === 'loading') {
@@ -42,7 +58,9 @@
   function setup() {
     createHelperPanel();
     attachGlobalListeners();
+    startContextCapture();
     loadChatHistory();
+    schedulePrefetch();
     console.log('Form Helper: Ready - click any form field or use chat');
   }
 
@@ -50,10 +68,11 @@
   async function loadChatHistory() {
     try {
       const domain = window.location.hostname;
-      const result = await chrome.storage.local.get([`chat_${domain}`]);
+      const result = await chrome.storage.local.get([`chat_${domain}`, `chatSession_${domain}`]);
       if (result[`chat_${domain}`]) {
         state.chatMessages = result[`chat_${domain}`];
       }
+      state.chatSessionId = result[`chatSession_${domain}`] || null;
     } catch (error) {
       console.error('Error loading chat history:', error);
     }
@@ -63,36 +82,151 @@
   async function saveChatHistory() {
     try {
       const domain = window.location.hostname;
-      await chrome.storage.local.set({ [`chat_${domain}`]: state.chatMessages });
+      await chrome.storage.local.set({
+        [`chat_${domain}`]: state.chatMessages,
+        [`chatSession_${domain}`]: state.chatSessionId
+      });
     } catch (error) {
       console.error('Error saving chat history:', error);
     }
   }
 
-  // Extract page context for AI
-  function extractPageContext() {
-    // Get all visible text content
-    const bodyText = document.body.innerText || '';
+  // ========== PAGE CONTEXT CAPTURE ==========
+
+  // Build the field map once, then follow edits and DOM changes
+  function startContextCapture() {
+    document.querySelectorAll('input, select, textarea').forEach(recordField);
+    document.addEventListener('input', handleFieldEdit, true);
+    document.addEventListener('change', handleFieldEdit, true);
     
-    // Get form field data
-    const formData = {};
-    document.querySelectorAll('input, select, textarea').forEach(el => {
-      if (el.closest('#gov-helper-panel')) return; // Skip our own panel
-      const name = el.name || el.id;
-      const value = el.value;
-      if (name && value) {
-        formData[name] = value;
+    const observer = new MutationObserver(handleMutations);
+    observer.observe(document.body, { childList: true, subtree: true, characterData: true });
+  }
+
+  function readFieldValue(el) {
+    const type = el.type?.toLowerCase();
+    if (type === 'radio') {
+      const checked = document.querySelector(`input[type="radio"][name="${CSS.escape(el.name)}"]:checked`);
+      return checked ? checked.value : '';
+    }
+    if (type === 'checkbox') {
+      return el.checked ? el.value : '';
+    }
+    return el.value;
+  }
+
+  function recordField(el) {
+    if (el.closest('#gov-helper-panel')) return; // Skip our own panel
+    const name = el.name || el.id;
+    if (!name) return;
+    
+    const value = readFieldValue(el);
+    const previous = formSync.fields[name];
+    if (value) {
+      if (previous === value) return;
+      formSync.fields[name] = value;
+    } else {
+      if (previous === undefined) return;
+      delete formSync.fields[name];
+    }
+    formSync.dirty.add(name);
+  }
+
+  function forgetField(el) {
+    const name = el.name || el.id;
+    if (!name || !(name in formSync.fields)) return;
+    const escaped = CSS.escape(name);
+    if (document.querySelector(`[name="${escaped}"], [id="${escaped}"]`)) return; // Still on the page
+    delete formSync.fields[name];
+    formSync.dirty.add(name);
+  }
+
+  function handleFieldEdit(event) {
+    const el = event.target;
+    if (el.matches && el.matches('input, select, textarea')) {
+      recordField(el);
+    }
+  }
+
+  function handleMutations(mutations) {
+    let textChanged = false;
+    
+    mutations.forEach(mutation => {
+      const target = mutation.target.nodeType === Node.ELEMENT_NODE ? mutation.target : mutation.target.parentElement;
+      if (target && target.closest('#gov-helper-panel')) return;
+      textChanged = true;
+      
+      mutation.addedNodes.forEach(node => {
+        if (node.nodeType !== Node.ELEMENT_NODE) return;
+        if (node.matches('input, select, textarea')) recordField(node);
+        node.querySelectorAll('input, select, textarea').forEach(recordField);
+      });
+      mutation.removedNodes.forEach(node => {
+        if (node.nodeType !== Node.ELEMENT_NODE) return;
+        if (node.matches('input, select, textarea')) forgetField(node);
+        node.querySelectorAll('input, select, textarea').forEach(forgetField);
+      });
+    });
+    
+    if (textChanged) {
+      pageTextDirty = true;
+      schedulePageTextRefresh();
+    }
+  }
+
+  // Re-read innerText (which forces a layout) only once the page settles
+  function schedulePageTextRefresh() {
+    clearTimeout(pageTextTimer);
+    pageTextTimer = setTimeout(() => {
+      if ('requestIdleCallback' in window) {
+        requestIdleCallback(refreshPageText, { timeout: 2000 });
+      } else {
+        refreshPageText();
       }
+    }, CONFIG.pageTextRefreshDelay);
+  }
+
+  function refreshPageText() {
+    if (!pageTextDirty) return;
+    pageTextCache = (document.body.innerText || '').substring(0, CONFIG.pageTextMaxChars);
+    pageTextDirty = false;
+  }
+
+  // Extract page context for AI, with the form fields changed since the last sync
+  function extractPageContext() {
+    refreshPageText();
+    
+    const delta = {};
+    formSync.dirty.forEach(name => {
+      delta[name] = name in formSync.fields ? formSync.fields[name] : null;
     });
     
     return {
-      page_title: document.title,
-      page_url: window.location.href,
-      form_data: formData,
-      page_text: bodyText.substring(0, 8000) // Limit to 8000 chars
+      pageContext: {
+        page_title: document.title,
+        page_url: window.location.href,
+        page_text: pageTextCache
+      },
+      formSync: {
+        syncId: formSync.syncId,
+        baseVersion: formSync.syncedVersion,
+        version: formSync.syncedVersion + 1,
+        delta: delta,
+        fields: { ...formSync.fields }
+      }
     };
   }
 
+  // The backend now holds sync.fields; keep only the edits made since
+  function markFormSynced(sync) {
+    formSync.syncedVersion = sync.version;
+    formSync.dirty.forEach(name => {
+      if ((formSync.fields[name] ?? null) === (sync.fields[name] ?? null)) {
+        formSync.dirty.delete(name);
+      }
+    });
+  }
+
   function attachGlobalListeners() {
     // Use capture phase to catch events early
     document.addEventListener('focusin', handleFieldInteraction, true);
@@ -169,10 +303,19 @@
     state.error = null;
     state.selectedOption = null;
     
+    // Use guidance pre-fetched on page load when available
+    const prefetched = state.prefetchedHelp[getHelpKey(fieldInfo)];
+    if (prefetched) {
+      state.response = prefetched;
+      state.isLoading = false;
+    }
+    
     showPanel();
     highlightField(element);
     updatePanelContent();
     
+    if (prefetched) return;
+    
     // Call AI for guidance
     try {
       const optionsText = fieldInfo.options.map(o => o.label).join(', ');
@@ -186,6 +329,9 @@
         }
       });
 
+      // Superseded by another field or abandoned when the panel closed
+      if (response.cancelled) return;
+      
       if (response.success) {
         state.response = response.data;
       } else {
@@ -200,6 +346,62 @@
     updatePanelContent();
   }
 
+  // ========== PRE-FETCH FUNCTIONS ==========
+
+  function schedulePrefetch() {
+    if ('requestIdleCallback' in window) {
+      requestIdleCallback(prefetchPageHelp, { timeout: 2000 });
+    } else {
+      setTimeout(prefetchPageHelp, 0);
+    }
+  }
+
+  function getHelpKey(fieldInfo) {
+    const optionsText = fieldInfo.options.map(o => o.label).join(', ');
+    return `${fieldInfo.type}|${fieldInfo.question}|${optionsText}`;
+  }
+
+  // Warm guidance for every field on the page with one batch request
+  function prefetchPageHelp() {
+    const fields = [];
+    const seen = new Set();
+    
+    document.querySelectorAll('input, select, textarea').forEach(el => {
+      if (fields.length >= CONFIG.prefetchMaxFields || !isFormElement(el)) return;
+      
+      const fieldInfo = extractFieldInfoFromDOM(el);
+      if (!fieldInfo.question || fieldInfo.question.length < 3) return;
+      
+      const key = getHelpKey(fieldInfo);
+      if (seen.has(key)) return; // Radio groups share one question
+      seen.add(key);
+      
+      fields.push({
+        key,
+        fieldLabel: fieldInfo.question,
+        fieldType: fieldInfo.type,
+        fieldOptions: fieldInfo.options.map(o => o.label).join(', ')
+      });
+    });
+    
+    if (fields.length === 0) return;
+    console.log(`Form Helper: Pre-fetching guidance for ${fields.length} fields`);
+    
+    const port = chrome.runtime.connect({ name: 'form-help-batch' });
+    port.onMessage.addListener((event) => {
+      if (event.type === 'field') {
+        const field = fields[event.data.index];
+        if (field) state.prefetchedHelp[field.key] = event.data.response;
+      } else if (event.type === 'done' || event.type === 'error') {
+        port.disconnect();
+      }
+    });
+    port.postMessage({
+      type: 'PREFETCH_FORM_HELP',
+      payload: { fields, formContext: CONFIG.formContext }
+    });
+  }
+
   // ========== DOM DETECTION FUNCTIONS ==========
   
   function extractFieldInfoFromDOM(element) {
@@ -630,31 +832,16 @@
     
     try {
       // Extract page context
-      const pageContext = extractPageContext();
+      const { pageContext, formSync: sync } = extractPageContext();
       
-      // Send to backend
-      const response = await chrome.runtime.sendMessage({
-        type: 'SEND_CHAT_MESSAGE',
-        payload: {
-          message: message,
-          pageContext: pageContext,
-          chatHistory: state.chatMessages.slice(-10) // Last 10 messages
-        }
+      // Stream the answer from the backend
+      await streamChatResponse({
+        message: message,
+        pageContext: pageContext,
+        formSync: sync,
+        sessionId: state.chatSessionId,
+        chatHistory: state.chatMessages.slice(-10) // Last 10 messages
       });
-      
-      if (response.success) {
-        // Add AI response to state
-        state.chatMessages.push({
-          role: 'assistant',
-          content: response.data.response,
-          timestamp: response.data.timestamp
-        });
-        
-        // Save to storage
-        await saveChatHistory();
-      } else {
-        state.chatError = response.error || 'Failed to get response';
-      }
     } catch (error) {
       console.error('Chat error:', error);
       state.chatError = 'Unable to connect to AI service';
@@ -664,6 +851,60 @@
     renderChatMessages();
   }
 
+  // Send a chat message and render the answer as tokens arrive
+  function streamChatResponse(payload) {
+    return new Promise((resolve) => {
+      const port = chrome.runtime.connect({ name: 'chat-stream' });
+      let assistantMessage = null;
+      let finished = false;
+      
+      const finish = async () => {
+        if (finished) return;
+        finished = true;
+        port.disconnect();
+        if (assistantMessage) {
+          await saveChatHistory();
+        } else if (!state.chatError) {
+          state.chatError = 'Failed to get response';
+        }
+        resolve();
+      };
+      
+      port.onMessage.addListener((event) => {
+        if (event.type === 'start') {
+          state.chatSessionId = event.data.session_id || state.chatSessionId;
+        } else if (event.type === 'token') {
+          if (!assistantMessage) {
+            assistantMessage = {
+              role: 'assistant',
+              content: '',
+              timestamp: new Date().toISOString()
+            };
+            state.chatMessages.push(assistantMessage);
+            state.isChatLoading = false;
+          }
+          assistantMessage.content += event.data.text;
+          renderChatMessages();
+        } else if (event.type === 'done') {
+          if (!assistantMessage) {
+            assistantMessage = { role: 'assistant', content: '' };
+            state.chatMessages.push(assistantMessage);
+          }
+          assistantMessage.content = event.data.response;
+          assistantMessage.timestamp = event.data.timestamp;
+          markFormSynced(payload.formSync);
+          finish();
+        } else if (event.type === 'error') {
+          state.chatError = event.data.detail || 'Failed to get response';
+          finish();
+        }
+      });
+      
+      port.onDisconnect.addListener(() => finish());
+      port.postMessage({ type: 'SEND_CHAT_MESSAGE', payload });
+    });
+  }
+
   // Render chat messages
   function renderChatMessages() {
     const chatMessagesContainer = helperPanel.querySelector('#chat-messages');
@@ -822,6 +1063,11 @@
     state.isPanelVisible = false;
     helperPanel.classList.remove('visible');
     removeHighlight();
+    // Nobody will read guidance still being generated
+    if (state.isLoading) {
+      state.isLoading = false;
+      chrome.runtime.sendMessage({ type: 'CANCEL_FORM_HELP' }).catch(() => {});
+    }
   }
 
   function highlightField(element) {
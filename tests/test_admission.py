@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, LLMOverloaded, LLMRateLimited
+
+
+class ProviderRateLimit(Exception):
+    status_code = 429
+
+
+def test_sheds_when_queue_is_full():
+    async def scenario():
+        admission = AdmissionController(initial_limit=1, max_limit=1, max_queue=0)
+        async with admission.admit():
+            with pytest.raises(LLMOverloaded, match="queue is full"):
+                async with admission.admit():
+                    pass
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.rejected_queue == 1
+    assert admission.in_flight == 0
+
+
+def test_sheds_when_deadline_cannot_be_met():
+    async def scenario():
+        admission = AdmissionController(initial_limit=1, max_limit=1, latency_target_seconds=2.0)
+        async with admission.admit():
+            # One call ahead at ~1s average latency; 0.1s left is not enough
+            with pytest.raises(LLMOverloaded, match="capacity exhausted") as error:
+                async with admission.admit(deadline=time.monotonic() + 0.1):
+                    pass
+        return admission, error.value
+
+    admission, error = asyncio.run(scenario())
+    assert admission.shed == 1
+    assert error.status_code == 503
+    assert error.retry_after >= 1
+
+
+def test_rate_limit_rejects_past_deadline():
+    async def scenario():
+        admission = AdmissionController(rate_per_second=1, burst=1)
+        async with admission.admit():
+            pass
+        with pytest.raises(LLMRateLimited):
+            async with admission.admit(deadline=time.monotonic() + 0.1):
+                pass
+        return admission
+
+    assert asyncio.run(scenario()).rejected_rate == 1
+
+
+def test_provider_429_halves_the_limit():
+    async def scenario():
+        admission = AdmissionController(initial_limit=8, max_limit=32)
+        with pytest.raises(LLMRateLimited) as error:
+            async with admission.admit():
+                raise ProviderRateLimit("quota")
+        return admission, error.value
+
+    admission, error = asyncio.run(scenario())
+    assert admission.limit == 4
+    assert admission.provider_rate_limited == 1
+    assert isinstance(error.__cause__, ProviderRateLimit)
+    assert admission.in_flight == 0
+
+
+def test_queued_caller_is_admitted_when_a_slot_frees():
+    async def scenario():
+        admission = AdmissionController(initial_limit=1, max_limit=1)
+        order = []
+
+        async def call(name, hold):
+            async with admission.admit():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        await asyncio.gather(call("first", 0.05), call("second", 0))
+        return admission, order
+
+    admission, order = asyncio.run(scenario())
+    assert order == ["first", "second"]
+    assert admission.admitted == 2
+    assert admission.in_flight == 0
+
+
+def test_would_shed_applies_the_callers_deadline():
+    async def scenario():
+        admission = AdmissionController(initial_limit=1, max_limit=1, latency_target_seconds=10.0)
+        assert admission.would_shed(time.monotonic() + 0.1) is None
+        async with admission.admit():
+            # ~5s average latency ahead; 2s left sheds now, the default 10s wait does not
+            error = admission.would_shed(time.monotonic() + 2)
+            assert admission.would_shed(None) is None
+        return admission, error
+
+    admission, error = asyncio.run(scenario())
+    assert isinstance(error, LLMOverloaded)
+    assert error.retry_after >= 5
+    assert admission.shed == 1
+    assert admission.in_flight == 0
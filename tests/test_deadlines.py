@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+import deadlines
+from deadlines import (ClientDisconnected, DeadlineExceeded, current_deadline, remaining, resolve_deadline,
+                       run_request, within_deadline)
+
+
+class FakeRequest:
+    """Just enough of a Starlette request for the deadline helpers."""
+
+    def __init__(self, headers=None, disconnect_after=None):
+        self.headers = headers or {}
+        self.disconnect_after = disconnect_after
+
+    async def receive(self):
+        if self.disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.disconnect_after)
+        return {"type": "http.disconnect"}
+
+
+def test_resolve_deadline_takes_the_shortest_timeout():
+    now = time.monotonic()
+    deadline = resolve_deadline(FakeRequest({deadlines.DEADLINE_HEADER: "2000"}), 30, timeout_ms=5000)
+    assert 1.9 < deadline - now < 2.1
+    deadline = resolve_deadline(FakeRequest({deadlines.DEADLINE_HEADER: "soon"}), 30, timeout_ms=500)
+    assert 0.4 < deadline - now < 0.6
+    assert remaining(None) is None
+    assert remaining(now - 1) == 0
+
+
+def test_run_request_returns_result_under_its_deadline():
+    async def scenario():
+        async def work():
+            return current_deadline()
+
+        deadline = time.monotonic() + 1
+        return deadline, await run_request(FakeRequest(), work(), deadline)
+
+    deadline, seen = asyncio.run(scenario())
+    # The handler sees the request's deadline
+    assert seen == deadline
+
+
+def test_run_request_deadline_cancels_work():
+    async def scenario():
+        cancelled = []
+
+        async def work():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await run_request(FakeRequest(), work(), time.monotonic() + 0.05)
+        # Copied now: the work must be cancelled by the time run_request raises
+        return list(cancelled), time.monotonic() - started
+
+    before = deadlines.stats()["timed_out"]
+    cancelled, elapsed = asyncio.run(scenario())
+    assert cancelled == [1]
+    assert elapsed < 0.5
+    assert deadlines.stats()["timed_out"] == before + 1
+
+
+def test_run_request_disconnect_wins_over_later_deadline():
+    async def scenario():
+        cancelled = []
+
+        async def work():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        with pytest.raises(ClientDisconnected):
+            await run_request(FakeRequest(disconnect_after=0.01), work(), time.monotonic() + 0.5)
+        return list(cancelled)
+
+    before = deadlines.stats()["disconnected"]
+    assert asyncio.run(scenario()) == [1]
+    assert deadlines.stats()["disconnected"] == before + 1
+
+
+def test_within_deadline():
+    async def scenario():
+        assert await within_deadline(asyncio.sleep(0, "done"), time.monotonic() + 1) == "done"
+        with pytest.raises(DeadlineExceeded):
+            await within_deadline(asyncio.sleep(1), time.monotonic() + 0.01)
+
+    asyncio.run(scenario())
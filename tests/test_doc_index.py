@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from doc_index import DocIndex
+
+INDEX_DIR = Path(__file__).resolve().parent.parent / "backend" / "data" / "doc_index"
+
+
+def test_search_ranks_matching_passages():
+    index = DocIndex.load(INDEX_DIR)
+    results = index.search("passport fee", top_k=2)
+    assert 0 < len(results) <= 2
+    assert results == sorted(results, key=lambda passage: passage["score"], reverse=True)
+
+
+def test_non_positive_top_k_returns_nothing():
+    index = DocIndex.load(INDEX_DIR)
+    assert index.search("passport fee", top_k=0) == []
+    assert index.search("passport fee", top_k=-1) == []
+
+
+def test_empty_index():
+    assert DocIndex().search("passport fee") == []
@@ -0,0 +1,31 @@
+from json_extract import extract_json, extract_json_object
+
+
+def test_fenced_object_with_trailing_comma():
+    reply = '```json\n{"advice": "Use your legal name", "options": [1, 2,],}\n```'
+    assert extract_json(reply) == ({"advice": "Use your legal name", "options": [1, 2]}, False)
+
+
+def test_skips_stray_brace_in_prose():
+    assert extract_json_object('Here is {the answer}: {"advice": "ok"}') == {"advice": "ok"}
+
+
+def test_truncated_string_is_dropped_not_closed():
+    value, repaired = extract_json('{"needs_interaction": false, "advice": "Enter your na')
+    assert repaired
+    assert value == {"needs_interaction": False}
+
+
+def test_truncated_after_complete_value():
+    value, repaired = extract_json('{"advice": "Use your legal name", "options": ["a", "b"]')
+    assert repaired
+    assert value == {"advice": "Use your legal name", "options": ["a", "b"]}
+
+
+def test_truncated_number_is_not_trusted():
+    assert extract_json('{"advice": "ok", "count": 12') == ({"advice": "ok"}, True)
+
+
+def test_no_object():
+    assert extract_json("I cannot help with that") == (None, False)
+    assert extract_json("{") == (None, False)
@@ -0,0 +1,47 @@
+import pytest
+
+from label_matcher import TrigramIndex, canonicalize
+
+KNOWN = [
+    ("date of birth", "date_of_birth"),
+    ("date of birth dd mm yyyy", "date_of_birth"),
+    ("employment type", "employment_type"),
+    ("employment type of applicant", "employment_type"),
+    ("type of employment", "employment_type"),
+    ("given name", "given_name"),
+]
+
+
+@pytest.fixture
+def index():
+    return TrigramIndex.build(KNOWN, threshold=0.7)
+
+
+def test_canonicalize_cleans_numbering_and_abbreviations():
+    assert canonicalize("1. DOB *") == "date of birth"
+    assert canonicalize("जन्म तिथि / Date of Birth") == "date of birth"
+
+
+def test_canonicalize_keeps_devanagari_words_whole():
+    assert canonicalize("जन्म तिथि") == "जन्म तिथि"
+
+
+@pytest.mark.parametrize("label, target", [
+    ("date of brith", "date_of_birth"),
+    ("emplyment type", "employment_type"),
+    ("type of employment of the applicant", "employment_type"),
+])
+def test_matches_typos_and_filler_words(index, label, target):
+    match = index.match(canonicalize(label))
+    assert match is not None and match[0] == target
+
+
+@pytest.mark.parametrize("label", [
+    "Date of Birth of Father",
+    "Father's Date of Birth",
+    "Employment Type of Spouse",
+    "Mother's Given Name",
+    "Guardian's Date of Birth",
+])
+def test_rejects_labels_about_someone_else(index, label):
+    assert index.match(canonicalize(label)) is None
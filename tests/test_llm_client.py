@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from admission import AdmissionController, LLMOverloaded  # noqa: E402
+from llm_client import LLMClient  # noqa: E402
+from llm_router import LLMRouter, ModelRoute  # noqa: E402
+
+
+class FakeChat:
+    def __init__(self, behaviour, route, events):
+        self.behaviour = behaviour
+        self.route = route
+        self.events = events
+
+    async def send_message(self, message):
+        delay, result = self.behaviour[self.route.model]
+        self.events.append(("start", self.route.model))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.events.append(("cancelled", self.route.model))
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def make_client(behaviour, models, **router_options):
+    routes = [ModelRoute("gemini", model, failure_threshold=1) for model in models]
+    client = LLMClient(api_key="test", admission=AdmissionController(),
+                       router=LLMRouter(routes, **router_options))
+    events = []
+    client.new_chat = lambda system_message, session_id=None, route=None: FakeChat(behaviour, route, events)
+    return client, routes, events
+
+
+def test_hedge_wins_and_loser_is_cancelled():
+    async def scenario():
+        client, routes, events = make_client(
+            {"slow": (5.0, "slow answer"), "fast": (0.01, "fast answer")},
+            ["slow", "fast"], hedge_initial_delay=0.05,
+        )
+        reply = await client.send("system", "prompt")
+        await asyncio.sleep(0)
+        return reply, routes, events
+
+    reply, (slow, fast), events = asyncio.run(scenario())
+    assert reply == "fast answer"
+    assert fast.hedges == fast.hedge_wins == 1
+    assert ("cancelled", "slow") in events
+    # A cancelled call is not a failure
+    assert slow.failures == 0
+    assert slow.breaker.state == "closed"
+
+
+def test_hedge_to_the_same_model_counts_only_hedge_wins():
+    async def scenario():
+        client, (route,), events = make_client({"only": (0.1, "answer")}, ["only"], hedge_initial_delay=0.05)
+        # The original call answers first, so the replica loses
+        return await client.send("system", "prompt"), route
+
+    reply, route = asyncio.run(scenario())
+    assert reply == "answer"
+    assert route.hedges == 1
+    assert route.hedge_wins == 0
+
+
+def test_half_open_route_gets_a_single_probe():
+    async def scenario():
+        client, (first, second), events = make_client(
+            {"a": (0.05, "probe answer"), "b": (0, "fallback answer")}, ["a", "b"], hedge_enabled=False,
+        )
+        first.breaker.record_failure()
+        first.breaker.opened_at -= first.breaker.cooldown_seconds
+        # Both calls are scheduled before the probe is admitted
+        return await asyncio.gather(client.send("system", "prompt"), client.send("system", "prompt")), events
+
+    replies, events = asyncio.run(scenario())
+    assert sorted(replies) == ["fallback answer", "probe answer"]
+    assert events.count(("start", "a")) == 1
+
+
+def test_fails_over_to_next_model():
+    async def scenario():
+        client, routes, events = make_client(
+            {"a": (0, RuntimeError("boom")), "b": (0, "answer")}, ["a", "b"], hedge_enabled=False,
+        )
+        return await client.send("system", "prompt"), routes
+
+    reply, (first, second) = asyncio.run(scenario())
+    assert reply == "answer"
+    assert first.failures == 1
+    assert first.breaker.state == "open"
+    assert second.calls == 1
+
+
+def test_every_model_failing_raises_last_error_then_sheds():
+    async def scenario():
+        client, routes, events = make_client(
+            {"a": (0, RuntimeError("a down")), "b": (0, RuntimeError("b down"))}, ["a", "b"], hedge_enabled=False,
+        )
+        with pytest.raises(RuntimeError, match="b down"):
+            await client.send("system", "prompt")
+        # Both breakers are now open, so the next call is rejected up front
+        with pytest.raises(LLMOverloaded):
+            await client.send("system", "prompt")
+        return routes, events
+
+    routes, events = asyncio.run(scenario())
+    assert [route.failures for route in routes] == [1, 1]
+    assert events == [("start", "a"), ("start", "b")]
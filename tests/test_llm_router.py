@@ -0,0 +1,82 @@
+import llm_router
+from llm_router import CircuitBreaker, LLMRouter, ModelRoute, parse_model_list
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_router.time, "monotonic", clock)
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=30)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.available()
+    assert breaker.retry_after() == 30
+
+    clock.now += 30
+    assert breaker.available()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert breaker.claim()
+    assert not breaker.claim()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.available()
+    assert breaker.times_opened == 1
+
+
+def test_failed_probe_reopens_breaker(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_router.time, "monotonic", clock)
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.claim()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.available()
+
+
+def test_router_skips_open_routes():
+    primary, fallback = ModelRoute("gemini", "a", failure_threshold=1), ModelRoute("gemini", "b")
+    router = LLMRouter([primary, fallback])
+    primary.breaker.record_failure()
+    assert router.available() == [fallback]
+
+
+def test_claim_skips_routes_whose_probe_is_taken(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_router.time, "monotonic", clock)
+    primary, fallback = ModelRoute("gemini", "a", failure_threshold=1), ModelRoute("gemini", "b")
+    router = LLMRouter([primary, fallback])
+    primary.breaker.record_failure()
+    clock.now += primary.breaker.cooldown_seconds
+
+    assert router.claim(router.available()) is primary
+    assert router.claim(router.available()) is fallback
+
+
+def test_hedge_delay_uses_latency_percentile():
+    route = ModelRoute("gemini", "a")
+    router = LLMRouter([route], hedge_initial_delay=5.0, hedge_min_delay=0.5, min_samples=3)
+    assert router.hedge_delay(route) == 5.0
+    for seconds in (1.0, 2.0, 3.0):
+        route.latency.add(seconds)
+    assert router.hedge_delay(route) == 3.0
+    assert LLMRouter([route], hedge_enabled=False).hedge_delay(route) is None
+
+
+def test_parse_model_list():
+    routes = parse_model_list("gemini-2.5-flash, openai:gpt-4o-mini,", "gemini")
+    assert [route.name for route in routes] == ["gemini:gemini-2.5-flash", "openai:gpt-4o-mini"]
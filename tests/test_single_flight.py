@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, prompt_key
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.do("key", fn) for _ in range(3)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert results == ["answer"] * 3
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_one_waiter_cancelled_other_still_gets_result():
+    async def scenario():
+        flight, cancelled = SingleFlight(), []
+
+        async def fn():
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "answer"
+
+        first = asyncio.ensure_future(flight.do("key", fn))
+        second = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, cancelled
+
+    result, cancelled = asyncio.run(scenario())
+    assert result == "answer"
+    assert cancelled == []
+
+
+def test_last_waiter_cancelled_cancels_call_and_next_caller_starts_fresh():
+    async def scenario():
+        flight, cancelled, started = SingleFlight(), [], []
+
+        async def slow():
+            started.append("slow")
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                # Unwinding takes a while, like an LLM call cancelling its hedges
+                await asyncio.sleep(0.05)
+                raise
+
+        async def fast():
+            started.append("fast")
+            return "fresh"
+
+        waiters = [asyncio.ensure_future(flight.do("key", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        # The cancelled call may still be unwinding; it must not be reused
+        result = await flight.do("key", fast)
+        await asyncio.sleep(0)
+        return flight, result, cancelled, started
+
+    flight, result, cancelled, started = asyncio.run(scenario())
+    assert result == "fresh"
+    assert cancelled == [1]
+    assert started == ["slow", "fast"]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+
+        return await asyncio.gather(flight.do("key", fn), flight.do("key", fn), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [str(error) for error in results] == ["provider down", "provider down"]
+
+
+def test_prompt_key_separates_parts():
+    assert prompt_key("ab", "c") != prompt_key("a", "bc")
+    assert prompt_key("chat", None) == prompt_key("chat", "")